@@ -15,7 +15,6 @@ from dotenv import load_dotenv
 from src.core.config import Config
 from src.agents.crew import ProductionCrew
 from src.tools.fast_search import FastVideoSearch
-from src.tools.downloader import VideoDownloader
 from src.tools.broll_extractor import BRollExtractor
 from src.tools.flux_generator import FluxImageGenerator, integrate_with_image_fallback
 from src.tools.premiere_exporter import PremiereExporter
@@ -199,8 +198,8 @@ def download_clips():
         with open(plan_path, 'r') as f:
             plan = json.load(f)
         
-        downloader = VideoDownloader()
-        extractor = BRollExtractor()
+        # Only the clip's segment is fetched, never the full source video
+        extractor = BRollExtractor(output_dir=str(OUTPUT_DIR / "clips"))
         
         extracted_clips = []
         
@@ -224,27 +223,23 @@ def download_clips():
                 continue
             
             try:
-                # Download
-                video_path = downloader.download(
-                    url=best_video['url'],
-                    output_dir=str(OUTPUT_DIR / "downloads")
-                )
-                
-                if not video_path:
-                    continue
-                
                 # Extract clip
-                clip_path = extractor.extract_best_clip(
-                    video_path=video_path,
+                clips = extractor._extract_random_clips(
+                    video={
+                        'url': best_video['url'],
+                        'id': best_video['url'].split('=')[-1],  # Extract video ID from URL
+                        'title': best_video.get('title', 'Unknown')
+                    },
+                    scene_description=scene_desc,
                     duration=scene.get('duration', 5),
-                    output_dir=str(OUTPUT_DIR / "clips")
+                    num_clips=1
                 )
                 
-                if clip_path:
+                if clips:
                     extracted_clips.append({
                         'scene': scene_desc,
                         'scene_number': scene_num,
-                        'path': clip_path,
+                        'path': clips[0]['path'],
                         'source_url': best_video['url']
                     })
             
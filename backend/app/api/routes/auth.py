@@ -4,6 +4,8 @@ Authentication Routes
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from firebase_admin import auth as firebase_auth
+import asyncio
 from app.dependencies import verify_firebase_token, get_current_user
 
 router = APIRouter()
@@ -22,9 +24,7 @@ async def verify_token(request: TokenVerifyRequest):
     Frontend sends Firebase token, backend verifies it
     """
     try:
-        from firebase_admin import auth
-        
-        decoded_token = auth.verify_id_token(request.token)
+        decoded_token = await asyncio.to_thread(firebase_auth.verify_id_token, request.token)
         
         return {
             'success': True,
@@ -3,43 +3,80 @@ Projects Routes
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from typing import Optional
 from app.dependencies import get_current_user
 from firebase_admin import firestore
+from datetime import datetime
+import asyncio
+import base64
+import orjson
 
-from app.dependencies import db
+from app.dependencies import get_db, redis_client
 
 router = APIRouter()
 
+# Fields returned by list_projects (script/result blobs are skipped)
+PROJECT_LIST_FIELDS = ['job_id', 'title', 'status', 'progress', 'created_at', 'completed_at']
+PROJECT_LIST_DEFAULTS = {'progress': 0, 'created_at': None, 'completed_at': None}
+
+# Page size for list_projects
+PROJECT_PAGE_SIZE = 50
+
+# Read-through cache TTL for single project documents (seconds)
+PROJECT_CACHE_TTL = 30
+
+
+def encode_cursor(project) -> str:
+    """Encode a project snapshot's sort position as an opaque page cursor"""
+    created_at = project.get('created_at').isoformat()
+    return base64.urlsafe_b64encode(f"{created_at}|{project.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a page cursor into start_after() values"""
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return {'created_at': datetime.fromisoformat(created_at), '__name__': doc_id}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/")
-async def list_projects(user: dict = Depends(get_current_user)):
+async def list_projects(cursor: Optional[str] = None, user: dict = Depends(get_current_user)):
     """
-    List all user's projects
+    List user's projects, newest first
+    
+    Pass the returned next_cursor to fetch the following page.
+    Uses the (user_id ASC, created_at DESC) composite index in firestore.indexes.json.
     """
-    try:
-        projects_ref = db.collection('projects').where('user_id', '==', user['user_id'])
-        projects = projects_ref.order_by('created_at', direction=firestore.Query.DESCENDING).limit(50).stream()
-        
-        result = []
-        for project in projects:
-            data = project.to_dict()
-            result.append({
-                'job_id': data['job_id'],
-                'title': data['title'],
-                'status': data['status'],
-                'progress': data.get('progress', 0),
-                'created_at': data.get('created_at'),
-                'completed_at': data.get('completed_at')
-            })
-        
-        return {
-            'success': True,
-            'projects': result,
-            'total': len(result)
-        }
+    db = get_db()
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    projects_ref = db.collection('projects').select(PROJECT_LIST_FIELDS).where('user_id', '==', user['user_id'])
+    query = (
+        projects_ref
+        .order_by('created_at', direction=firestore.Query.DESCENDING)
+        .order_by(firestore.FieldPath.document_id(), direction=firestore.Query.DESCENDING)
+    )
+    
+    if cursor:
+        query = query.start_after(decode_cursor(cursor))
+    
+    query = query.limit(PROJECT_PAGE_SIZE)
+    projects = await asyncio.to_thread(lambda: list(query.stream()))
+    
+    # The projection already limits each document to PROJECT_LIST_FIELDS,
+    # so a single dict merge fills in the optional ones
+    result = [{**PROJECT_LIST_DEFAULTS, **project.to_dict()} for project in projects]
+    
+    next_cursor = encode_cursor(projects[-1]) if len(projects) == PROJECT_PAGE_SIZE else None
+    
+    return {
+        'success': True,
+        'projects': result,
+        'total': len(result),
+        'next_cursor': next_cursor
+    }
 
 
 @router.get("/{job_id}")
@@ -47,24 +84,37 @@ async def get_project(job_id: str, user: dict = Depends(get_current_user)):
     """
     Get project details
     """
-    try:
-        project_ref = db.collection('projects').document(job_id)
-        project = project_ref.get()
+    db = get_db()
+    
+    cache_key = f"project:{job_id}"
+    cached = await redis_client.get(cache_key)
+    
+    if cached:
+        data = orjson.loads(cached)
         
-        if not project.exists:
+        # Same answer as the owner-filtered query below
+        if data['user_id'] != user['user_id']:
             raise HTTPException(status_code=404, detail="Project not found")
+    else:
+        # Ownership is part of the query, so another user's project
+        # comes back empty instead of being read and rejected
+        projects_ref = db.collection('projects')
+        query = (
+            projects_ref
+            .where(firestore.FieldPath.document_id(), '==', projects_ref.document(job_id))
+            .where('user_id', '==', user['user_id'])
+            .limit(1)
+        )
+        projects = await asyncio.to_thread(lambda: list(query.stream()))
         
-        data = project.to_dict()
-        
-        if data['user_id'] != user['user_id']:
-            raise HTTPException(status_code=403, detail="Access denied")
+        if not projects:
+            raise HTTPException(status_code=404, detail="Project not found")
         
-        return {
-            'success': True,
-            'project': data
-        }
+        # Encode Firestore timestamps the same way the response would
+        data = jsonable_encoder(projects[0].to_dict())
+        await redis_client.set(cache_key, orjson.dumps(data), ex=PROJECT_CACHE_TTL)
     
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        'success': True,
+        'project': data
+    }
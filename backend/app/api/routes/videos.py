@@ -3,28 +3,162 @@ Video Generation API Routes
 Main pipeline endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, Optional
 from app.dependencies import get_current_user, check_rate_limit
 from app.workers.tasks.pipeline_task import run_full_pipeline
 from app.services.queue_service import QueueService
 from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+from datetime import datetime
+import asyncio
+import hashlib
+import orjson
+import secrets
 import uuid
 
-from app.dependencies import db
+from app.dependencies import firebase_initialized, get_db, redis_client
 
 router = APIRouter()
 queue_service = QueueService()
 
+# Short TTL for cached Firestore status documents (seconds)
+JOB_STATUS_CACHE_TTL = 2
+
+# Queue stats are shared by all pollers and recomputed at most once per TTL
+QUEUE_STATS_CACHE_KEY = "queue_stats:v1"
+QUEUE_STATS_CACHE_TTL = 1
+
+# Queued jobs may wait a long time before a worker picks them up
+JOB_QUEUED_TTL = 24 * 3600
+
+# Firestore caps a single WriteBatch at 500 operations
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def delete_document_tree(doc_ref):
+    """
+    Delete a document and everything in its subcollections
+    
+    Deletes are grouped into WriteBatch commits of up to 500 operations
+    instead of one RPC per document. The root delete carries an exists
+    precondition, so a missing document raises NotFound without a prior read.
+    """
+    db = get_db()
+    
+    batch = db.batch()
+    pending = 0
+    stack = [doc_ref]
+    
+    while stack:
+        ref = stack.pop()
+        for collection in ref.collections():
+            stack.extend(collection.list_documents())
+        
+        if ref is doc_ref:
+            batch.delete(ref, option=db.write_option(exists=True))
+        else:
+            batch.delete(ref)
+        pending += 1
+        
+        if pending == FIRESTORE_BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    
+    if pending:
+        batch.commit()
+
+
+# Firestore status reads in flight, keyed by job_id
+_inflight_status_reads: Dict[str, asyncio.Task] = {}
+
+
+async def _fetch_job_status(job_id: str) -> Optional[bytes]:
+    """Read a job's status from Firestore and cache the serialized body"""
+    db = get_db()
+    
+    project_ref = db.collection('projects').document(job_id)
+    project = await asyncio.to_thread(project_ref.get)
+    
+    if not project.exists:
+        return None
+    
+    project_data = project.to_dict()
+    
+    status_json = orjson.dumps({
+        'job_id': job_id,
+        'status': project_data.get('status', 'unknown'),
+        'progress': project_data.get('progress', 0),
+        'current_step': project_data.get('current_step'),
+        'eta_seconds': project_data.get('eta_seconds'),
+        'error': project_data.get('error'),
+        'result': project_data.get('result')
+    })
+    
+    await redis_client.set(f"job_status:{job_id}", status_json, ex=JOB_STATUS_CACHE_TTL)
+    
+    return status_json
+
+
+def _finish_status_read(job_id: str, task: asyncio.Task):
+    """Done callback of a shared status read: let the next caller start a fresh one"""
+    if _inflight_status_reads.get(job_id) is task:
+        del _inflight_status_reads[job_id]
+    
+    # Mark a failure retrieved in case every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+
+async def read_job_status(job_id: str) -> Optional[bytes]:
+    """
+    Read a job's status from Firestore, coalescing concurrent callers
+    
+    The first caller for a job_id starts the read as its own task, and
+    every caller (the first included) awaits it shielded, so a caller
+    that disconnects and gets cancelled never cancels the read for the
+    others.
+    """
+    task = _inflight_status_reads.get(job_id)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_job_status(job_id))
+        _inflight_status_reads[job_id] = task
+        task.add_done_callback(lambda done: _finish_status_read(job_id, done))
+    
+    return await asyncio.shield(task)
+
+
+def json_response(request: Request, body: bytes, max_age: int = 1) -> Response:
+    """
+    Send an already-serialized JSON body as-is
+    
+    Adds a weak ETag of the body and answers 304 when the client
+    already holds the same version.
+    """
+    etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"Cache-Control": f"max-age={max_age}", "ETag": etag}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 class VideoGenerationRequest(BaseModel):
     """Video generation request"""
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     script: str
-    duration: int = 60
+    duration: int = Field(60, ge=1, le=3600)  # Frontend presets go up to 35 minutes
     title: Optional[str] = None
 
 
+# Build the validator once at import, never on the request path
+VideoGenerationRequest.model_rebuild()
+
+
 class JobStatusResponse(BaseModel):
     """Job status response"""
     job_id: str
@@ -50,54 +184,65 @@ async def generate_video(request: VideoGenerationRequest):
     
     Returns job_id for status tracking
     """
-    try:
-        # Create job ID
-        job_id = str(uuid.uuid4())
-        user_id = "anonymous"  # No auth for now
-        
-        # Create project in Firestore (if available)
-        if db is not None:
-            project_ref = db.collection('projects').document(job_id)
-            project_ref.set({
-                'job_id': job_id,
-                'user_id': user_id,
-                'title': request.title or 'Untitled Video',
-                'script': request.script,
-                'duration': request.duration,
-                'status': 'queued',
-                'progress': 0,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
-        
-        # Queue job to Celery
-        task = run_full_pipeline.delay(
-            job_id=job_id,
-            user_id=user_id,
-            script=request.script,
-            duration=request.duration
-        )
-        
-        # Store task ID (if Firestore available)
-        if db is not None:
-            project_ref.update({
-                'task_id': task.id
-            })
-        
-        return {
-            'success': True,
+    db = get_db()
+    
+    # Create job ID (task ID is pre-assigned so the project is written once)
+    job_id = secrets.token_hex(16)
+    task_id = str(uuid.uuid4())
+    user_id = "anonymous"  # No auth for now
+    
+    # Create project in Firestore (if available)
+    if db is not None:
+        project_ref = db.collection('projects').document(job_id)
+        await asyncio.to_thread(project_ref.set, {
             'job_id': job_id,
-            'task_id': task.id,
+            'user_id': user_id,
+            'title': request.title or 'Untitled Video',
+            'script': request.script,
+            'duration': request.duration,
             'status': 'queued',
-            'message': 'Video generation started. Check status with /api/videos/status/{job_id}'
-        }
+            'progress': 0,
+            'task_id': task_id,
+            'created_at': firestore.SERVER_TIMESTAMP,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Record queued state in Redis so status polls never need to ask Celery
+    await redis_client.setex(
+        f"job_progress:{job_id}",
+        JOB_QUEUED_TTL,
+        orjson.dumps({
+            'job_id': job_id,
+            'status': 'queued',
+            'progress': 0,
+            'current_step': 'Waiting in queue...',
+            'eta_seconds': 0,
+            'updated_at': datetime.utcnow().isoformat()
+        })
+    )
+    
+    # Queue job to Celery
+    task = run_full_pipeline.apply_async(
+        kwargs={
+            'job_id': job_id,
+            'user_id': user_id,
+            'script': request.script,
+            'duration': request.duration
+        },
+        task_id=task_id
+    )
+    
+    return {
+        'success': True,
+        'job_id': job_id,
+        'task_id': task.id,
+        'status': 'queued',
+        'message': 'Video generation started. Check status with /api/videos/status/{job_id}'
+    }
 
 
 @router.get("/status/{job_id}")
-async def get_job_status(job_id: str):
+async def get_job_status(job_id: str, request: Request):
     """
     Get job status and progress
     
@@ -110,74 +255,37 @@ async def get_job_status(job_id: str):
     """
     try:
         # Try Redis first (fastest, always available)
-        import redis
-        from app.config import settings
-        
-        redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-        progress_json = redis_client.get(f"job_progress:{job_id}")
+        progress_json, result_json = await redis_client.mget(
+            f"job_progress:{job_id}",
+            f"job_result:{job_id}"
+        )
         
         if progress_json:
-            import json
-            progress_data = json.loads(progress_json)
+            # Stored progress is already the response body unless a result
+            # has to be spliced in
+            if not result_json:
+                return json_response(request, progress_json)
+            
+            progress_data = orjson.loads(progress_json)
             
-            # Check if completed, get result from Redis
+            # Check if completed, attach result from Redis
             if progress_data.get('status') == 'completed':
-                result_json = redis_client.get(f"job_result:{job_id}")
-                if result_json:
-                    progress_data['result'] = json.loads(result_json)
+                progress_data['result'] = orjson.loads(result_json)
             
-            return progress_data
+            return json_response(request, orjson.dumps(progress_data))
+        
+        # Cached Firestore status (short TTL, avoids a Firestore read per poll)
+        cache_key = f"job_status:{job_id}"
+        cached_status = await redis_client.get(cache_key)
+        if cached_status:
+            return json_response(request, cached_status)
         
         # Fallback to Firestore (if available)
-        if db is not None:
-            project_ref = db.collection('projects').document(job_id)
-            project = project_ref.get()
+        if firebase_initialized:
+            status_json = await read_job_status(job_id)
             
-            if project.exists:
-                project_data = project.to_dict()
-                
-                return {
-                    'job_id': job_id,
-                    'status': project_data.get('status', 'unknown'),
-                    'progress': project_data.get('progress', 0),
-                    'current_step': project_data.get('current_step'),
-                    'eta_seconds': project_data.get('eta_seconds'),
-                    'error': project_data.get('error'),
-                    'result': project_data.get('result')
-                }
-        
-        # Last resort: Check Celery task status
-        from app.workers.celery_app import celery_app
-        
-        inspect = celery_app.control.inspect()
-        
-        # Check active tasks
-        active = inspect.active()
-        if active:
-            for worker, tasks in active.items():
-                for task in tasks:
-                    if job_id in str(task.get('args', [])):
-                        return {
-                            'job_id': job_id,
-                            'status': 'processing',
-                            'progress': 50,
-                            'current_step': 'Processing video...',
-                            'eta_seconds': 60
-                        }
-        
-        # Check reserved tasks (queued)
-        reserved = inspect.reserved()
-        if reserved:
-            for worker, tasks in reserved.items():
-                for task in tasks:
-                    if job_id in str(task.get('args', [])):
-                        return {
-                            'job_id': job_id,
-                            'status': 'queued',
-                            'progress': 0,
-                            'current_step': 'Waiting in queue...',
-                            'eta_seconds': 120
-                        }
+            if status_json:
+                return json_response(request, status_json)
         
         # Not found - might be completed or very old
         raise HTTPException(status_code=404, detail="Job not found")
@@ -196,7 +304,7 @@ async def get_job_status(job_id: str):
 
 
 @router.get("/download/{job_id}")
-async def get_download_links(job_id: str):
+async def get_download_links(job_id: str, request: Request):
     """
     Get download links for completed job
     
@@ -205,42 +313,39 @@ async def get_download_links(job_id: str):
     - capcut_url: CapCut project download link
     - expires_at: Link expiration time
     """
-    try:
-        if db is None:
-            raise HTTPException(status_code=503, detail="Database not available")
-        
-        # Get project from Firestore
-        project_ref = db.collection('projects').document(job_id)
-        project = project_ref.get()
-        
-        if not project.exists:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        project_data = project.to_dict()
-        
-        # Check if completed
-        if project_data.get('status') != 'completed':
-            raise HTTPException(
-                status_code=400,
-                detail=f"Job not completed yet. Status: {project_data.get('status')}"
-            )
-        
-        # Get download links from result
-        result = project_data.get('result', {})
-        
-        return {
-            'job_id': job_id,
-            'premiere_url': result.get('premiere_url'),
-            'capcut_url': result.get('capcut_url'),
-            'expires_at': result.get('expires_at'),
-            'clips_count': result.get('clips_count', 0),
-            'images_count': result.get('images_count', 0)
-        }
+    db = get_db()
     
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    
+    # Get project from Firestore
+    project_ref = db.collection('projects').document(job_id)
+    project = await asyncio.to_thread(project_ref.get)
+    
+    if not project.exists:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    project_data = project.to_dict()
+    
+    # Check if completed
+    if project_data.get('status') != 'completed':
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job not completed yet. Status: {project_data.get('status')}"
+        )
+    
+    # Get download links from result
+    result = project_data.get('result', {})
+    
+    # Links don't change once the job is completed
+    return json_response(request, orjson.dumps({
+        'job_id': job_id,
+        'premiere_url': result.get('premiere_url'),
+        'capcut_url': result.get('capcut_url'),
+        'expires_at': result.get('expires_at'),
+        'clips_count': result.get('clips_count', 0),
+        'images_count': result.get('images_count', 0)
+    }), max_age=60)
 
 
 @router.delete("/{job_id}")
@@ -248,31 +353,27 @@ async def delete_job(job_id: str):
     """
     Delete job and associated files
     """
+    db = get_db()
+    
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    
+    # Delete from Firestore (including any subcollections)
+    project_ref = db.collection('projects').document(job_id)
+    
     try:
-        if db is None:
-            raise HTTPException(status_code=503, detail="Database not available")
-        
-        # Get project from Firestore
-        project_ref = db.collection('projects').document(job_id)
-        project = project_ref.get()
-        
-        if not project.exists:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        # Delete from Firestore
-        project_ref.delete()
-        
-        # TODO: Delete files from DigitalOcean Spaces
-        
-        return {
-            'success': True,
-            'message': 'Job deleted successfully'
-        }
+        await asyncio.to_thread(delete_document_tree, project_ref)
+    except NotFound:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    await redis_client.delete(f"project:{job_id}", f"job_status:{job_id}")
+    
+    # TODO: Delete files from DigitalOcean Spaces
+    
+    return {
+        'success': True,
+        'message': 'Job deleted successfully'
+    }
 
 
 @router.get("/queue/status")
@@ -285,16 +386,18 @@ async def get_queue_status():
     - processing_jobs: Number of jobs currently processing
     - estimated_wait_time: Estimated wait time in seconds
     """
-    try:
-        queue_stats = queue_service.get_queue_stats()
-        
-        return {
-            'pending_jobs': queue_stats['pending'],
-            'processing_jobs': queue_stats['processing'],
-            'completed_jobs': queue_stats['completed'],
-            'failed_jobs': queue_stats['failed'],
-            'estimated_wait_time_seconds': queue_stats['estimated_wait_time']
-        }
+    cached_stats = await redis_client.get(QUEUE_STATS_CACHE_KEY)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if cached_stats:
+        queue_stats = orjson.loads(cached_stats)
+    else:
+        queue_stats = await asyncio.to_thread(queue_service.get_queue_stats)
+        await redis_client.set(QUEUE_STATS_CACHE_KEY, orjson.dumps(queue_stats), ex=QUEUE_STATS_CACHE_TTL)
+    
+    return {
+        'pending_jobs': queue_stats['pending'],
+        'processing_jobs': queue_stats['processing'],
+        'completed_jobs': queue_stats['completed'],
+        'failed_jobs': queue_stats['failed'],
+        'estimated_wait_time_seconds': queue_stats['estimated_wait_time']
+    }
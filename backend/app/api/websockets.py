@@ -3,25 +3,234 @@ WebSocket Routes for Real-time Progress Updates
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from firebase_admin import firestore
+from starlette.websockets import WebSocketState
+from typing import Dict, Optional, Set
 import asyncio
-import json
+import orjson
 
-from app.dependencies import db
+from app.dependencies import get_db, redis_client
 
 router = APIRouter()
 
+# Job states after which no further updates are sent
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+class JobUpdateHub:
+    """
+    Fan-out of worker progress updates to this process's WebSocket viewers
+    
+    One pattern subscription to job:* per process, so open sockets don't
+    each hold a connection from the shared Redis pool. Every viewer gets
+    its own local queue; None on a queue means the feed stopped.
+    """
+    
+    def __init__(self):
+        self._viewers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+    
+    async def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Queue receiving the raw updates published for job_id from now on"""
+        queue = asyncio.Queue()
+        self._viewers.setdefault(job_id, set()).add(queue)
+        
+        try:
+            await self._ensure_started()
+        except Exception:
+            self.unsubscribe(job_id, queue)
+            raise
+        
+        return queue
+    
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        """Stop delivering job_id's updates to queue"""
+        viewers = self._viewers.get(job_id)
+        if viewers is not None:
+            viewers.discard(queue)
+            if not viewers:
+                del self._viewers[job_id]
+    
+    async def _ensure_started(self):
+        if self._reader is not None and not self._reader.done():
+            return
+        
+        async with self._start_lock:
+            if self._reader is not None and not self._reader.done():
+                return
+            
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.psubscribe("job:*")
+            except Exception:
+                await pubsub.aclose()
+                raise
+            
+            self._pubsub = pubsub
+            self._reader = asyncio.create_task(self._forward(pubsub))
+    
+    async def _forward(self, pubsub):
+        """Route each published update to the queues of its job's viewers"""
+        try:
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                
+                job_id = message['channel'].decode().partition(':')[2]
+                for queue in self._viewers.get(job_id, ()):
+                    queue.put_nowait(message['data'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job update subscription failed: {e}")
+        
+        # Feed is gone: end every open stream; the next viewer resubscribes
+        for viewers in self._viewers.values():
+            for queue in viewers:
+                queue.put_nowait(None)
+        await pubsub.aclose()
+    
+    async def close(self):
+        """Stop the subscription (app shutdown)"""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+job_updates = JobUpdateHub()
+
+
+async def load_job_state(job_id: str) -> Optional[dict]:
+    """Current job state: Redis progress first, Firestore as fallback"""
+    progress_json = await redis_client.get(f"job_progress:{job_id}")
+    if progress_json:
+        return orjson.loads(progress_json)
+    
+    db = get_db()
+    if db is not None:
+        project = await asyncio.to_thread(db.collection('projects').document(job_id).get)
+        if project.exists:
+            data = project.to_dict()
+            return {
+                'job_id': job_id,
+                'status': data.get('status', 'unknown'),
+                'progress': data.get('progress', 0),
+                'current_step': data.get('current_step'),
+                'eta_seconds': data.get('eta_seconds'),
+                'error': data.get('error'),
+                'result': data.get('result')
+            }
+    
+    return None
+
+
+def update_signature(data: dict) -> tuple:
+    """Fields that make an update worth sending to the client"""
+    return (data.get('status'), data.get('progress'), data.get('current_step'))
+
+
+async def send_update(websocket: WebSocket, job_id: str, data: dict) -> bool:
+    """
+    Send one progress update to the client
+    
+    Returns:
+        True if the job reached a terminal state
+    """
+    status = data.get('status')
+    
+    if status == 'completed' and not data.get('result'):
+        result_json = await redis_client.get(f"job_result:{job_id}")
+        if result_json:
+            data['result'] = orjson.loads(result_json)
+    
+    # Text frame, the frontend parses event.data as a JSON string
+    await websocket.send_text(orjson.dumps(data).decode())
+    return status in TERMINAL_STATUSES
+
+
+async def stream_updates(websocket: WebSocket, job_id: str, queue: asyncio.Queue, last_sent: tuple):
+    """Forward published updates until the job reaches a terminal state"""
+    while True:
+        raw = await queue.get()
+        if raw is None:
+            return
+        
+        data = orjson.loads(raw)
+        signature = update_signature(data)
+        if signature == last_sent:
+            continue
+        last_sent = signature
+        
+        if await send_update(websocket, job_id, data):
+            return
+
+
+async def wait_for_disconnect(websocket: WebSocket):
+    """Return once the client goes away (clients never send anything)"""
+    while True:
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+
 
 @router.websocket("/progress/{job_id}")
 async def websocket_progress(websocket: WebSocket, job_id: str):
     """
     WebSocket endpoint for real-time job progress updates
-    DISABLED: Requires Firebase/Firestore
     
-    Use polling via GET /api/videos/status/{job_id} instead
+    The worker publishes every progress change on the Redis channel
+    job:{job_id}; this process's single subscription (job_updates) hands
+    them to each viewer instead of every viewer reading Firestore. Dead
+    clients are detected by uvicorn's protocol pings (--ws-ping-interval),
+    and the disconnect watcher drops the viewer's queue right away
+    instead of at the next update.
     """
     await websocket.accept()
-    await websocket.send_json({
-        'error': 'WebSocket not available. Use polling via /api/videos/status/{job_id}'
-    })
-    await websocket.close()
+    
+    tasks = []
+    queue = None
+    
+    try:
+        # Subscribe before reading the current state so no update is missed
+        queue = await job_updates.subscribe(job_id)
+        
+        data = await load_job_state(job_id)
+        
+        if data is None:
+            await websocket.send_text(orjson.dumps({'job_id': job_id, 'error': 'Job not found'}).decode())
+            return
+        
+        if await send_update(websocket, job_id, data):
+            return
+        
+        # Forward updates until the job finishes or the client goes away
+        tasks = [
+            asyncio.create_task(stream_updates(websocket, job_id, queue, update_signature(data))),
+            asyncio.create_task(wait_for_disconnect(websocket))
+        ]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        
+        for task in done:
+            task.result()
+    
+    except WebSocketDisconnect:
+        pass
+    
+    finally:
+        for task in tasks:
+            task.cancel()
+        
+        if queue is not None:
+            job_updates.unsubscribe(job_id, queue)
+        
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
@@ -18,10 +18,13 @@ class Settings(BaseSettings):
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
         "http://localhost:5173",
-        "https://vidsquad.vercel.app",
-        "https://*.vercel.app",
-        "*"  # Allow all for now
+        "https://vidsquad.vercel.app"
     ]
+    CORS_ORIGIN_REGEX: str = r"https://.*\.vercel\.app"  # Vercel preview deployments
+    CORS_MAX_AGE: int = 86400  # Browsers cache preflight responses for a day
+    
+    # Firestore
+    FIRESTORE_CLIENT_POOL_SIZE: int = 4  # Clients (gRPC channels) per process
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -4,30 +4,103 @@ Authentication, rate limiting, etc.
 """
 
 from fastapi import Header, HTTPException, Depends
+from fastapi.encoders import jsonable_encoder
 from typing import Optional
 import firebase_admin
 from firebase_admin import auth, credentials, firestore
+from google.cloud import firestore as google_firestore
 from app.config import settings
-import redis
+import redis.asyncio as aioredis
 from functools import wraps
+from datetime import datetime
+import asyncio
+import hashlib
+import itertools
+import orjson
 import time
 
 # Initialize Firebase
 firebase_initialized = False
-db = None
+
+# Firestore clients, each with its own gRPC channel, handed out round-robin
+# so concurrent requests don't queue on a single channel
+firestore_clients = []
+_firestore_cycle = None
 
 if settings.FIREBASE_CREDENTIALS_PATH:
     try:
         cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
         firebase_admin.initialize_app(cred)
-        db = firestore.client()
+        firestore_clients = [
+            google_firestore.Client(project=cred.project_id, credentials=cred.get_credential())
+            for _ in range(settings.FIRESTORE_CLIENT_POOL_SIZE)
+        ]
+        _firestore_cycle = itertools.cycle(firestore_clients)
         firebase_initialized = True
     except Exception as e:
         print(f"Warning: Firebase initialization failed: {e}")
         print("Running without Firebase authentication")
 
-# Initialize Redis
-redis_client = redis.from_url(settings.REDIS_URL)
+
+def get_db():
+    """Next Firestore client from the pool (None when Firebase is not configured)"""
+    if _firestore_cycle is None:
+        return None
+    return next(_firestore_cycle)
+
+
+# Initialize Redis (async client over one shared connection pool;
+# connections are opened lazily and released in the app lifespan)
+redis_pool = aioredis.ConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=64,
+    health_check_interval=30
+)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+# How long a verified ID token is trusted without re-checking its signature
+TOKEN_CACHE_TTL = 300
+
+# User documents are cached briefly; the worker drops the entry when it
+# bumps the monthly video count
+USER_CACHE_TTL = 30
+USER_FIELDS = ['user_id', 'email', 'subscription_tier', 'videos_created_this_month', 'created_at']
+
+# Remaining monthly video quota is re-synced from Firestore after this long
+REMAINING_QUOTA_TTL = 900
+
+# Token bucket rate limiter (refill + take in a single atomic round trip)
+# KEYS[1]: bucket key
+# ARGV: now_ms, capacity, refill rate (tokens per ms), cost
+TOKEN_BUCKET_LUA = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local now = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return allowed
+"""
+
+# Cached by SHA and invoked with EVALSHA (falls back to EVAL on NOSCRIPT)
+token_bucket = redis_client.register_script(TOKEN_BUCKET_LUA)
 
 
 async def verify_firebase_token(authorization: Optional[str] = Header(None)) -> dict:
@@ -50,8 +123,21 @@ async def verify_firebase_token(authorization: Optional[str] = Header(None)) ->
         # Extract token from "Bearer <token>"
         token = authorization.replace("Bearer ", "")
         
-        # Verify token with Firebase
-        decoded_token = auth.verify_id_token(token)
+        # Reuse a recent verification of the same token (shared by all workers)
+        cache_key = f"auth:{hashlib.blake2b(token.encode(), digest_size=16).hexdigest()}"
+        cached = await redis_client.get(cache_key)
+        
+        if cached:
+            decoded_token = orjson.loads(cached)
+        else:
+            # Verify token with Firebase
+            # Signature check (and occasional key fetch) runs off the event loop
+            decoded_token = await asyncio.to_thread(auth.verify_id_token, token)
+            
+            # Never cache past the token's own expiry
+            ttl = min(TOKEN_CACHE_TTL, int(decoded_token['exp'] - time.time()))
+            if ttl > 0:
+                await redis_client.setex(cache_key, ttl, orjson.dumps(decoded_token))
         
         # Get user data
         user_id = decoded_token['uid']
@@ -79,9 +165,15 @@ async def get_current_user(user_data: dict = Depends(verify_firebase_token)) ->
     """
     user_id = user_data['user_id']
     
-    # Get user from Firestore
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
+    # Check cache
+    cache_key = f"user:{user_id}"
+    cached = await redis_client.get(cache_key)
+    if cached:
+        return orjson.loads(cached)
+    
+    # Get user from Firestore (only the fields routes read)
+    user_ref = get_db().collection('users').document(user_id)
+    user_doc = await asyncio.to_thread(user_ref.get, field_paths=USER_FIELDS)
     
     if not user_doc.exists:
         # Create new user
@@ -93,41 +185,63 @@ async def get_current_user(user_data: dict = Depends(verify_firebase_token)) ->
             'created_at': firestore.SERVER_TIMESTAMP,
             'updated_at': firestore.SERVER_TIMESTAMP
         }
-        user_ref.set(user_data_firestore)
+        await asyncio.to_thread(user_ref.set, user_data_firestore)
         return user_data_firestore
     
-    return user_doc.to_dict()
+    user = jsonable_encoder(user_doc.to_dict())
+    await redis_client.setex(cache_key, USER_CACHE_TTL, orjson.dumps(user))
+    
+    return user
 
 
-async def check_rate_limit(user: dict = Depends(get_current_user)):
+async def check_rate_limit(user_data: dict = Depends(verify_firebase_token)) -> dict:
     """
     Check if user has exceeded rate limit
     
+    Remaining monthly quota is kept in Redis (remaining:{user_id}:{YYYY-MM})
+    and decremented by the worker when a video completes, so the user
+    document is only read when the counter has expired.
+    
     Args:
-        user: Current user data
+        user_data: Verified user data from token
     
     Raises:
         HTTPException: If rate limit exceeded
     """
-    tier = user.get('subscription_tier', 'free')
-    videos_created = user.get('videos_created_this_month', 0)
+    key = f"remaining:{user_data['user_id']}:{datetime.utcnow():%Y-%m}"
+    remaining = await redis_client.get(key)
     
-    # Get rate limit for tier
-    limits = {
-        'free': settings.RATE_LIMIT_FREE,
-        'pro': settings.RATE_LIMIT_PRO,
-        'enterprise': settings.RATE_LIMIT_ENTERPRISE
-    }
-    
-    limit = limits.get(tier, settings.RATE_LIMIT_FREE)
+    if remaining is None:
+        user = await get_current_user(user_data)
+        tier = user.get('subscription_tier', 'free')
+        videos_created = user.get('videos_created_this_month', 0)
+        
+        # Get rate limit for tier
+        limits = {
+            'free': settings.RATE_LIMIT_FREE,
+            'pro': settings.RATE_LIMIT_PRO,
+            'enterprise': settings.RATE_LIMIT_ENTERPRISE
+        }
+        
+        limit = limits.get(tier, settings.RATE_LIMIT_FREE)
+        remaining = limit - videos_created
+        
+        await redis_client.set(key, remaining, ex=REMAINING_QUOTA_TTL)
+        
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded. Upgrade to create more videos. ({videos_created}/{limit})"
+            )
     
-    if videos_created >= limit:
+    elif int(remaining) <= 0:
+        # Only the counter is cached, so report what's left rather than the usage
         raise HTTPException(
             status_code=429,
-            detail=f"Rate limit exceeded. Upgrade to create more videos. ({videos_created}/{limit})"
+            detail="Rate limit exceeded. Upgrade to create more videos. (0 remaining)"
         )
     
-    return user
+    return user_data
 
 
 def cache_response(ttl: int = 3600):
@@ -140,19 +254,20 @@ def cache_response(ttl: int = 3600):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = f"cache:{func.__name__}:{str(args)}:{str(kwargs)}"
+            # Generate cache key (hashed so long arguments keep keys small)
+            arg_hash = hashlib.blake2b(f"{args!r}:{kwargs!r}".encode(), digest_size=16).hexdigest()
+            cache_key = f"cache:{func.__name__}:{arg_hash}"
             
             # Check cache
-            cached = redis_client.get(cache_key)
+            cached = await redis_client.get(cache_key)
             if cached:
-                return eval(cached)
+                return orjson.loads(cached)
             
             # Call function
             result = await func(*args, **kwargs)
             
             # Store in cache
-            redis_client.setex(cache_key, ttl, str(result))
+            await redis_client.setex(cache_key, ttl, orjson.dumps(jsonable_encoder(result)))
             
             return result
         return wrapper
@@ -177,18 +292,14 @@ def rate_limit_api(max_requests: int = 100, window: int = 60):
             
             user_id = user.get('user_id')
             
-            # Rate limit key
-            key = f"rate_limit:{user_id}:{int(time.time() / window)}"
-            
-            # Increment counter
-            count = redis_client.incr(key)
-            
-            # Set expiry on first request
-            if count == 1:
-                redis_client.expire(key, window)
+            # Bucket holds max_requests tokens and refills over one window
+            allowed = await token_bucket(
+                keys=[f"rl:{user_id}"],
+                args=[int(time.time() * 1000), max_requests, max_requests / (window * 1000), 1]
+            )
             
             # Check limit
-            if count > max_requests:
+            if not allowed:
                 raise HTTPException(
                     status_code=429,
                     detail=f"Too many requests. Try again in {window} seconds."
@@ -5,39 +5,57 @@ Production-ready API for AI Video Production System
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+import re
 import time
 from pathlib import Path
 
 from app.api.routes import auth, projects, videos, images, exports
 from app.api import websockets
+from app import dependencies
 from app.config import settings
 
+# Shared resources lifecycle
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release shared Redis connections and Firestore channels on shutdown"""
+    yield
+    await websockets.job_updates.close()
+    await dependencies.redis_client.aclose()
+    await dependencies.redis_pool.disconnect()
+    for client in dependencies.firestore_clients:
+        client.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="AI Video Production API",
     description="Generate professional videos with AI",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins
-    allow_credentials=False,  # Must be False when using "*"
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=settings.CORS_ORIGINS,
+    allow_origin_regex=settings.CORS_ORIGIN_REGEX,
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=settings.CORS_MAX_AGE,
 )
 
 # Request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
     response = await call_next(request)
-    process_time = time.time() - start_time
+    process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
@@ -91,23 +109,50 @@ async def root():
     }
 
 # Error handlers
+def is_allowed_origin(origin: str) -> bool:
+    """Whether the CORS middleware above accepts this origin"""
+    return origin in settings.CORS_ORIGINS or bool(
+        settings.CORS_ORIGIN_REGEX and re.fullmatch(settings.CORS_ORIGIN_REGEX, origin)
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    """Global exception handler"""
-    return JSONResponse(
+    """Global exception handler (routes don't wrap their own 500s)"""
+    response = ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
-            "message": str(exc)
+            "detail": str(exc)
         }
     )
+    
+    # Starlette runs this handler outside CORSMiddleware, so the browser
+    # would hide the error body from the frontend without these headers
+    origin = request.headers.get("origin")
+    if origin and is_allowed_origin(origin):
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Vary"] = "Origin"
+    
+    return response
 
 if __name__ == "__main__":
+    import os
     import uvicorn
+    
+    # DEV=1 runs a single auto-reloading process (reload can't be combined
+    # with workers); otherwise match the Dockerfile's production settings
+    dev = bool(int(os.getenv("DEV", "0")))
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        workers=2
+        reload=dev,
+        workers=1 if dev else int(os.getenv("WEB_CONCURRENCY", "2")),
+        loop="auto" if dev else "uvloop",
+        http="auto" if dev else "httptools",
+        ws="websockets",
+        log_level="info",
+        ws_ping_interval=15,
+        ws_ping_timeout=10
     )
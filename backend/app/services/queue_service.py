@@ -5,7 +5,7 @@ Monitor Celery queue status
 
 from app.workers.celery_app import celery_app
 from firebase_admin import firestore
-from app.dependencies import db
+from app.dependencies import get_db
 
 
 class QueueService:
@@ -18,6 +18,8 @@ class QueueService:
         Returns:
             Dict with queue stats
         """
+        db = get_db()
+        
         try:
             # Get active tasks from Celery
             inspect = celery_app.control.inspect()
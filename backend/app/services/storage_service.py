@@ -3,6 +3,7 @@ Storage Service - Supports both Local and DigitalOcean Spaces
 """
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config as BotoConfig
 from app.config import settings
 import os
@@ -10,6 +11,14 @@ from pathlib import Path
 import zipfile
 import shutil
 
+# Large project ZIPs are uploaded as concurrent 8 MB multipart parts
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
+
 
 class StorageService:
     """Handle file uploads to Local Storage or DigitalOcean Spaces"""
@@ -24,7 +33,8 @@ class StorageService:
                 endpoint_url=settings.DO_SPACES_ENDPOINT,
                 aws_access_key_id=settings.DO_SPACES_KEY,
                 aws_secret_access_key=settings.DO_SPACES_SECRET,
-                config=BotoConfig(signature_version='s3v4')
+                # Room for the parts of two concurrent multipart uploads
+                config=BotoConfig(signature_version='s3v4', max_pool_connections=32)
             )
             self.bucket = settings.DO_SPACES_BUCKET
         else:
@@ -58,7 +68,8 @@ class StorageService:
                     file_path,
                     self.bucket,
                     object_name,
-                    ExtraArgs={'ACL': 'public-read'}
+                    ExtraArgs={'ACL': 'public-read'},
+                    Config=UPLOAD_TRANSFER_CONFIG
                 )
                 
                 url = f"{settings.DO_SPACES_ENDPOINT}/{self.bucket}/{object_name}"
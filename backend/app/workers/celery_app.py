@@ -3,7 +3,12 @@ Celery Application Configuration
 """
 
 from celery import Celery
+from celery.signals import after_setup_logger, worker_process_init, worker_process_shutdown
+from logging.handlers import QueueHandler, QueueListener
 from app.config import settings
+import atexit
+import logging
+import queue
 
 # Create Celery app
 celery_app = Celery(
@@ -33,5 +38,41 @@ celery_app.conf.task_routes = {
     'app.workers.tasks.pipeline_task.*': {'queue': 'default'},
 }
 
+
+# Worker log handlers run on a QueueListener thread so tasks never block
+# on stdout; forked pool processes don't inherit that thread and start their own
+_log_handlers = []
+_process_log_listener = None
+
+
+def start_log_listener():
+    """Route the root logger through a queue drained by a background thread"""
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *_log_handlers, respect_handler_level=True)
+    logging.getLogger().handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+
+@after_setup_logger.connect
+def offload_log_writes(logger, **kwargs):
+    _log_handlers[:] = logger.handlers
+    atexit.register(start_log_listener().stop)
+
+
+@worker_process_init.connect
+def restart_log_listener(**kwargs):
+    global _process_log_listener
+    if _log_handlers:
+        _process_log_listener = start_log_listener()
+
+
+@worker_process_shutdown.connect
+def flush_process_logs(**kwargs):
+    # Pool processes exit without running atexit handlers
+    if _process_log_listener is not None:
+        _process_log_listener.stop()
+
+
 if __name__ == '__main__':
     celery_app.start()
@@ -4,36 +4,106 @@ Orchestrates the complete video generation pipeline
 """
 
 from app.workers.celery_app import celery_app
+from celery import chain, chord
+from concurrent.futures import ThreadPoolExecutor
 from firebase_admin import firestore
 from datetime import datetime, timedelta
+from functools import lru_cache
 import sys
 import os
+from pathlib import Path
 import redis
 import json
+import logging
+import orjson
+import re
 
-# Add parent directory to path to import src modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+# Add the backend directory to path to import src modules
+BACKEND_ROOT = str(Path(__file__).resolve().parents[3])
+if BACKEND_ROOT not in sys.path:
+    sys.path.append(BACKEND_ROOT)
 
 from src.core.config import Config
 from src.agents.crew import ProductionCrew
 from src.tools.fast_search import FastVideoSearch
+from src.tools.channel_video_finder import ChannelVideoFinder
 from src.tools.downloader import VideoDownloader
 from src.tools.broll_extractor import BRollExtractor
-from src.tools.flux_generator import integrate_with_image_fallback
+from src.tools.flux_generator import FluxImageGenerator
+from src.tools.image_fallback import ImageFallbackGenerator
 from src.tools.premiere_exporter import PremiereExporter
 from src.tools.capcut_exporter import CapCutExporter
 from app.services.storage_service import StorageService
-from app.dependencies import db
+from app.dependencies import get_db
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 storage_service = StorageService()
 
-# Redis client for progress tracking
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Stateless tools shared by every job in this worker process
+channel_finder = ChannelVideoFinder()
+premiere_exporter = PremiereExporter()
+capcut_exporter = CapCutExporter()
+
+# Redis client for progress tracking (one pool shared by the task's threads;
+# payloads are orjson bytes, so responses are left undecoded)
+redis_pool = redis.ConnectionPool.from_url(settings.REDIS_URL, max_connections=64)
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+# Decrement the API's cached monthly quota, but only if it is cached
+# (a missing counter is recomputed from Firestore on the next check)
+decrement_quota = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('DECR', KEYS[1])
+end
+return nil
+""")
+
+# LLM output parsing: the plan is the first JSON object in the crew result
+json_decoder = json.JSONDecoder()
+JSON_BLOCK_RE = re.compile(r'\{.*\}', re.DOTALL)
+TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+
+# Fallback plan: sentences become scenes, words of 5+ letters their keywords
+SENTENCE_RE = re.compile(r'[^.]+')
+KEYWORD_RE = re.compile(r'\b\w{5,}\b')
+
+@lru_cache(maxsize=1)
+def get_crew() -> ProductionCrew:
+    """Production crew (LLM client and search tools), built once per worker process"""
+    return ProductionCrew(Config.load())
+
+
+@lru_cache(maxsize=1)
+def get_image_generators():
+    """Image prompt and FLUX generators, built once per worker process"""
+    return ImageFallbackGenerator(), FluxImageGenerator(provider="cloudflare")
+
+
+def invalidate_job_cache(job_id: str):
+    """Drop API-side cached copies of the job's Firestore document"""
+    redis_client.delete(f"job_status:{job_id}", f"project:{job_id}")
+
+
+def store_progress(job_id: str, progress_data: dict, result_data: dict = None):
+    """
+    Store job progress in Redis (1 hour TTL) and publish it to WebSocket listeners
+    
+    result_data, if given, is stored as job_result in the same round trip,
+    ahead of the progress so readers of a completed job always find it.
+    """
+    progress_json = orjson.dumps(progress_data)
+    pipe = redis_client.pipeline(transaction=False)
+    if result_data is not None:
+        pipe.setex(f"job_result:{job_id}", 3600, orjson.dumps(result_data))
+    pipe.setex(f"job_progress:{job_id}", 3600, progress_json)
+    pipe.publish(f"job:{job_id}", progress_json)
+    pipe.execute()
 
 
-def update_job_progress(job_id: str, status: str, progress: int, current_step: str = None, eta_seconds: int = None):
-    """Update job progress in Redis and Firestore"""
+def update_job_progress(job_id: str, status: str, progress: int, current_step: str = None, eta_seconds: int = None, persist_to_firestore: bool = False):
+    """Update job progress in Redis (and Firestore when persist_to_firestore is set)"""
     
     # Update Redis (always available)
     progress_data = {
@@ -45,15 +115,12 @@ def update_job_progress(job_id: str, status: str, progress: int, current_step: s
         'updated_at': datetime.utcnow().isoformat()
     }
     
-    # Store in Redis with 1 hour expiration
-    redis_client.setex(
-        f"job_progress:{job_id}",
-        3600,  # 1 hour TTL
-        json.dumps(progress_data)
-    )
+    # Store in Redis and notify WebSocket listeners
+    store_progress(job_id, progress_data)
     
-    # Also update Firestore if available
-    if db is not None:
+    # Most ticks only feed the WebSocket; Firestore gets the milestones
+    db = get_db()
+    if db is not None and persist_to_firestore:
         project_ref = db.collection('projects').document(job_id)
         update_data = {
             'status': status,
@@ -70,9 +137,49 @@ def update_job_progress(job_id: str, status: str, progress: int, current_step: s
             project_ref.update(update_data)
         except:
             pass  # Ignore Firestore errors
+        
+        # Invalidate cached Firestore documents used by the API
+        invalidate_job_cache(job_id)
     
     # Print for logs
-    print(f"Progress: {progress}% - {current_step or status}")
+    logger.info("Progress: %s%% - %s", progress, current_step or status)
+
+
+def find_best_video(scene: dict):
+    """First sample video found for a scene, if any"""
+    for query_obj in scene.get('search_queries', []):
+        videos = query_obj.get('sample_videos', [])
+        if videos:
+            return videos[0]
+    return None
+
+
+def mark_job_failed(job_id: str, error_msg: str):
+    """Record a failed job in Redis and Firestore"""
+    # Update job as failed in Redis
+    store_progress(job_id, {
+        'job_id': job_id,
+        'status': 'failed',
+        'progress': 0,
+        'current_step': 'Failed',
+        'error': error_msg,
+        'updated_at': datetime.utcnow().isoformat()
+    })
+    
+    # Update job as failed in Firestore (if available)
+    db = get_db()
+    if db is not None:
+        try:
+            project_ref = db.collection('projects').document(job_id)
+            project_ref.update({
+                'status': 'failed',
+                'error': error_msg,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+        except:
+            pass  # Ignore Firestore errors
+        
+        invalidate_job_cache(job_id)
 
 
 @celery_app.task(bind=True, name='run_full_pipeline')
@@ -82,231 +189,296 @@ def run_full_pipeline(self, job_id: str, user_id: str, script: str, duration: in
     
     Steps:
     1. AI Script Analysis (20%)
-    2. Video Search (40%)
-    3. Download & Extract Clips (60%)
-    4. Generate AI Images (80%)
-    5. Export Projects (100%)
+    2. Video Search (per scene)
+    3. Download & Extract Clips (per scene)
+    4. Generate AI Images (per scene, 85% once all scenes are done)
+    5. Export Projects (100%, in assemble_and_export)
+    
+    Steps 2-4 run as one chain per scene in a chord, so scenes are
+    spread over all workers; this task returns once they are queued.
     """
     try:
         output_dir = f"temp/{user_id}/{job_id}"
-        os.makedirs(output_dir, exist_ok=True)
+        
+        # Create the working directories once, up front, for every scene task
+        for subdir in ('clips', 'images'):
+            os.makedirs(f"{output_dir}/{subdir}", exist_ok=True)
         
         # STEP 1: AI Script Analysis
-        update_job_progress(job_id, 'processing', 10, 'Analyzing script with AI...', 240)
+        update_job_progress(job_id, 'processing', 10, 'Analyzing script with AI...', 240, persist_to_firestore=True)
         
-        config = Config.load()
-        crew = ProductionCrew(config)
+        crew = get_crew()
         result = crew.analyze_script(script, duration)
         
-        # Parse result with robust JSON extraction
-        import re
-        import json
-        
-        # Try to extract JSON from the result
-        result_str = str(result)
-        
-        # Try multiple JSON extraction methods
-        plan = None
+        # Use structured output directly when the crew produced it
+        # (CrewOutput.json_dict); model_dump() would be the CrewOutput
+        # wrapper itself, not the plan
+        if isinstance(result, dict):
+            plan = result
+        else:
+            plan = getattr(result, 'json_dict', None) or None
+        
+        # Otherwise parse the raw text with robust JSON extraction
+        result_str = '' if plan else getattr(result, 'raw', None) or str(result)
+        
+        # Method 1: Decode the first embedded JSON object that is a plan; a
+        # nested scene object that parses on its own while the outer plan
+        # doesn't must not be taken for the plan
+        start = result_str.find('{')
+        index = start
+        while index != -1 and plan is None:
+            try:
+                candidate, _ = json_decoder.raw_decode(result_str, index)
+            except json.JSONDecodeError:
+                candidate = None
+            
+            if isinstance(candidate, dict) and 'scenes' in candidate:
+                plan = candidate
+            else:
+                index = result_str.find('{', index + 1)
         
-        # Method 1: Find JSON block with regex
-        json_match = re.search(r'\{.*\}', result_str, re.DOTALL)
-        if json_match:
+        if start != -1 and plan is None:
+            logger.warning("JSON parse error (method 1): no valid JSON object found")
+            
+            # Method 2: Try to fix common JSON issues
+            json_match = JSON_BLOCK_RE.search(result_str, start)
+            json_str = json_match.group() if json_match else result_str[start:]
+            # Remove trailing commas
+            json_str = TRAILING_COMMA_RE.sub(r'\1', json_str)
+            # Fix single quotes to double quotes
+            json_str = json_str.replace("'", '"')
+            
             try:
-                plan = json.loads(json_match.group())
-            except json.JSONDecodeError as e:
-                print(f"JSON parse error (method 1): {e}")
-                
-                # Method 2: Try to fix common JSON issues
-                json_str = json_match.group()
-                # Remove trailing commas
-                json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-                # Fix single quotes to double quotes
-                json_str = json_str.replace("'", '"')
-                
-                try:
-                    plan = json.loads(json_str)
-                except json.JSONDecodeError:
-                    print("JSON parse error (method 2): Still invalid")
+                plan = orjson.loads(json_str)
+            except orjson.JSONDecodeError:
+                logger.warning("JSON parse error (method 2): Still invalid")
         
         # If still no plan, create a simple fallback based on the script
         if not plan:
-            print("Creating fallback plan from script")
+            logger.info("Creating fallback plan from script")
+            
+            # Split script into sentences for scenes (stop scanning at the max of 12)
+            sentences = []
+            for match in SENTENCE_RE.finditer(script):
+                sentence = match.group().strip()
+                if sentence:
+                    sentences.append(sentence)
+                    if len(sentences) == 12:
+                        break
             
-            # Split script into sentences for scenes
-            sentences = [s.strip() for s in script.split('.') if s.strip()]
-            num_scenes = min(len(sentences), 12)  # Max 12 scenes
+            num_scenes = max(len(sentences), 6)  # Minimum 6 scenes
             
-            if num_scenes < 6:
-                num_scenes = 6  # Minimum 6 scenes
+            # Use script sentences or generic descriptions
+            descriptions = sentences + [f"Scene {i+1} from the video" for i in range(len(sentences), num_scenes)]
             
             plan = {
                 'title': 'AI Generated Video',
-                'scenes': []
+                'scenes': [
+                    {
+                        'scene_number': i + 1,
+                        'scene_description': scene_desc,
+                        'duration': 5,
+                        'visual_context': scene_desc,
+                        'mood_tone': 'informative, engaging',
+                        'keywords': KEYWORD_RE.findall(scene_desc.lower())[:5],  # Top 5 long words
+                        'search_queries': []  # No video search for fallback
+                    }
+                    for i, scene_desc in enumerate(descriptions)
+                ]
             }
             
-            for i in range(num_scenes):
-                # Use script sentences or generic descriptions
-                if i < len(sentences):
-                    scene_desc = sentences[i]
-                else:
-                    scene_desc = f"Scene {i+1} from the video"
-                
-                # Extract keywords from description
-                words = scene_desc.lower().split()
-                keywords = [w for w in words if len(w) > 4][:5]  # Top 5 long words
-                
-                plan['scenes'].append({
-                    'scene_number': i + 1,
-                    'scene_description': scene_desc,
-                    'duration': 5,
-                    'visual_context': scene_desc,
-                    'mood_tone': 'informative, engaging',
-                    'keywords': keywords,
-                    'search_queries': []  # No video search for fallback
-                })
-            
-            print(f"Created fallback plan with {num_scenes} scenes")
+            logger.info("Created fallback plan with %d scenes", num_scenes)
         
         update_job_progress(job_id, 'processing', 20, 'Script analyzed', 180)
         
-        # STEP 2: Video Search
-        update_job_progress(job_id, 'processing', 30, 'Searching for videos...', 150)
-        
-        # Use channel-based search (bypasses YouTube bot detection)
-        from src.tools.channel_video_finder import ChannelVideoFinder
-        
-        channel_finder = ChannelVideoFinder()
-        
-        for scene in plan.get('scenes', []):
-            try:
-                # Find videos from curated channels
-                videos = channel_finder.find_videos_for_scene(scene)
-                
-                # Add results to scene
-                if 'search_queries' not in scene:
-                    scene['search_queries'] = []
-                
-                # Convert to expected format
-                scene['search_queries'].append({
-                    'query': scene.get('scene_description', '')[:50],
-                    'results_found': len(videos),
-                    'sample_videos': [
-                        {
-                            'title': v['title'],
-                            'url': v['url'],
-                            'duration': v['duration'],
-                            'relevance_score': 0.8  # Channel videos are pre-vetted
-                        }
-                        for v in videos[:3]
-                    ]
-                })
-            except Exception as e:
-                print(f"Search error for scene {scene.get('scene_number')}: {e}")
-                continue
-        
-        update_job_progress(job_id, 'processing', 40, 'Videos found', 120)
-        
-        # STEP 3: Extract Clips (PARALLEL extraction without full download)
-        update_job_progress(job_id, 'processing', 50, 'Extracting clips in parallel...', 90)
+        # STEP 2-4: Fan the scenes out across workers; each scene is searched,
+        # gets a clip extracted and, failing that, an AI image. The export
+        # runs as the chord callback once every scene is done.
+        scenes = plan.get('scenes', [])
+        project_name = plan.get('title', 'AI_Video').replace(' ', '_')
         
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        update_job_progress(job_id, 'processing', 30, f'Finding footage for {len(scenes)} scenes...', 150)
         
-        extractor = BRollExtractor(output_dir=f"{output_dir}/clips")
-        extracted_clips = []
+        redis_client.delete(f"scenes_done:{job_id}")
+        # If any scene chain fails (or hits the time limit) the chord body
+        # never runs, so its errback has to fail the job instead
+        export = assemble_and_export.s(job_id, user_id, project_name, output_dir)
+        export.on_error(fail_scene_job.s(job_id))
         
-        def extract_clip_for_scene(scene):
-            """Extract clip for a single scene (runs in parallel)"""
-            scene_num = scene.get('scene_number')
-            scene_duration = scene.get('duration', 5)
-            scene_desc = scene.get('scene_description', '')
-            
-            # Get best video
-            best_video = None
-            for query_obj in scene.get('search_queries', []):
-                videos = query_obj.get('sample_videos', [])
-                if videos:
-                    best_video = videos[0]
-                    break
-            
-            if not best_video:
-                return None
-            
-            try:
-                # Use existing broll_extractor to extract clip directly
-                clips = extractor._extract_random_clips(
-                    video={
-                        'url': best_video['url'],
-                        'id': best_video['url'].split('=')[-1],  # Extract video ID from URL
-                        'title': best_video.get('title', 'Unknown')
-                    },
-                    scene_description=scene_desc,
-                    duration=scene_duration,
-                    num_clips=1
+        if scenes:
+            chord([
+                chain(
+                    search_scene.s(scene),
+                    fetch_scene_clip.s(output_dir),
+                    generate_scene_image.s(job_id, output_dir, len(scenes))
                 )
-                
-                if clips:
-                    return {
-                        'scene': scene_desc,
-                        'scene_number': scene_num,
-                        'path': clips[0]['path'],
-                        'source_url': best_video['url']
-                    }
-            except Exception as e:
-                print(f"Error extracting clip for scene {scene_num}: {e}")
-                return None
+                for scene in scenes
+            ])(export)
+        else:
+            export.delay([])
         
-        # Extract clips in parallel (max 6 concurrent downloads)
-        with ThreadPoolExecutor(max_workers=6) as executor:
-            futures = {executor.submit(extract_clip_for_scene, scene): scene for scene in plan.get('scenes', [])}
+        return {
+            'success': True,
+            'job_id': job_id,
+            'scenes': len(scenes)
+        }
+    
+    except Exception as e:
+        mark_job_failed(job_id, str(e))
+        raise
+
+
+@celery_app.task(name='search_scene')
+def search_scene(scene: dict) -> dict:
+    """Find candidate videos for one scene from the curated channels"""
+    # Use channel-based search (bypasses YouTube bot detection)
+    try:
+        videos = channel_finder.find_videos_for_scene(scene)
+        
+        # Add results to scene in the expected format
+        scene.setdefault('search_queries', []).append({
+            'query': scene.get('scene_description', '')[:50],
+            'results_found': len(videos),
+            'sample_videos': [
+                {
+                    'title': v['title'],
+                    'url': v['url'],
+                    'duration': v['duration'],
+                    'relevance_score': 0.8  # Channel videos are pre-vetted
+                }
+                for v in videos[:3]
+            ]
+        })
+    except Exception as e:
+        logger.warning("Search error for scene %s: %s", scene.get('scene_number'), e)
+    
+    return scene
+
+
+@celery_app.task(name='fetch_scene_clip')
+def fetch_scene_clip(scene: dict, output_dir: str) -> dict:
+    """Extract a clip for one scene from its best search result (clip is None on failure)"""
+    scene_num = scene.get('scene_number')
+    scene_desc = scene.get('scene_description', '')
+    best_video = find_best_video(scene)
+    clip = None
+    
+    if best_video:
+        try:
+            # Use existing broll_extractor to extract clip directly
+            extractor = BRollExtractor(output_dir=f"{output_dir}/clips")
+            clips = extractor._extract_random_clips(
+                video={
+                    'url': best_video['url'],
+                    'id': best_video['url'].split('=')[-1],  # Extract video ID from URL
+                    'title': best_video.get('title', 'Unknown')
+                },
+                scene_description=scene_desc,
+                duration=scene.get('duration', 5),
+                num_clips=1
+            )
             
-            for future in as_completed(futures):
-                result = future.result()
-                if result:
-                    extracted_clips.append(result)
-                    print(f"✅ Extracted clip for scene {result['scene_number']}")
-        
-        print(f"\n✅ Total clips extracted: {len(extracted_clips)}")
-        
-        update_job_progress(job_id, 'processing', 60, f'{len(extracted_clips)} clips extracted', 60)
+            if clips:
+                clip = {
+                    'scene': scene_desc,
+                    'scene_number': scene_num,
+                    'path': clips[0]['path'],
+                    'source_url': best_video['url']
+                }
+                logger.info("Extracted clip for scene %s", scene_num)
+        except Exception as e:
+            logger.warning("Error extracting clip for scene %s: %s", scene_num, e)
+    
+    return {'scene': scene, 'clip': clip}
+
+
+@celery_app.task(name='generate_scene_image')
+def generate_scene_image(scene_result: dict, job_id: str, output_dir: str, total_scenes: int) -> dict:
+    """Generate the fallback AI image for a scene without a clip and report scene progress"""
+    scene = scene_result['scene']
+    images = []
+    
+    if scene_result['clip'] is None:
+        try:
+            fallback_gen, flux_gen = get_image_generators()
+            prompt_data = {
+                'scene_number': scene.get('scene_number'),
+                'scene_description': scene.get('scene_description', ''),
+                'keywords': scene.get('keywords', []),
+                'image_prompt': fallback_gen.generate_image_prompt(scene),
+                'visual_context': scene.get('visual_context', ''),
+                'mood_tone': scene.get('mood_tone', '')
+            }
+            images = flux_gen.generate_images_from_prompts(
+                prompts=[prompt_data],
+                output_dir=f"{output_dir}/images"
+            )
+        except Exception as e:
+            logger.warning("Image generation error for scene %s: %s", scene.get('scene_number'), e)
+    
+    # Scenes finish on different workers, so the count lives in Redis
+    done_key = f"scenes_done:{job_id}"
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.incr(done_key)
+    pipe.expire(done_key, 3600)
+    done, _ = pipe.execute()
+    update_job_progress(
+        job_id, 'processing', 30 + 55 * done // total_scenes,
+        f'{done}/{total_scenes} scenes ready', 60
+    )
+    
+    return {'clip': scene_result['clip'], 'images': images}
+
+
+@celery_app.task(name='fail_scene_job')
+def fail_scene_job(request, exc, traceback, job_id: str):
+    """Errback of the scene chord: mark the job failed so clients stop waiting"""
+    logger.error("Scene processing failed for job %s: %s", job_id, exc)
+    mark_job_failed(job_id, f"Scene processing failed: {exc}")
+
+
+@celery_app.task(name='assemble_and_export')
+def assemble_and_export(scene_results: list, job_id: str, user_id: str, project_name: str, output_dir: str):
+    """Collect the per-scene clips and images, export the projects and finish the job"""
+    db = get_db()
+    
+    try:
+        extracted_clips = [r['clip'] for r in scene_results if r['clip']]
+        generated_images = [image for r in scene_results for image in r['images']]
+        generated_images.sort(key=lambda image: image.get('scene_number') or 0)
         
-        # STEP 4: Generate AI Images
-        update_job_progress(job_id, 'processing', 70, 'Generating AI images...', 40)
+        logger.info("Total clips extracted: %d", len(extracted_clips))
         
-        result = integrate_with_image_fallback(
-            scenes=plan.get('scenes', []),
-            extracted_clips=extracted_clips,
-            output_dir=f"{output_dir}/images",
-            provider="cloudflare"
-        )
+        result = {
+            'success': True,
+            'missing_scenes': len(scene_results) - len(extracted_clips),
+            'generated_images': len(generated_images),
+            'images': generated_images
+        }
         
-        update_job_progress(job_id, 'processing', 80, f'{result.get("generated_images", 0)} images generated', 20)
+        redis_client.delete(f"scenes_done:{job_id}")
         
         # STEP 5: Export Projects
         update_job_progress(job_id, 'processing', 90, 'Creating project files...', 10)
         
-        project_name = plan.get('title', 'AI_Video').replace(' ', '_')
-        
-        # Export to Premiere Pro
-        premiere_exporter = PremiereExporter()
-        premiere_path = premiere_exporter.create_premiere_project(
-            clips=extracted_clips,
-            images=result.get('images', []),
-            output_dir=output_dir,
-            project_name=project_name
-        )
-        
-        # Export to CapCut
-        capcut_exporter = CapCutExporter()
-        capcut_path = capcut_exporter.create_capcut_project(
-            clips=extracted_clips,
-            images=result.get('images', []),
-            output_dir=output_dir,
-            project_name=project_name
-        )
-        
-        # Upload to DigitalOcean Spaces
-        premiere_url = storage_service.upload_folder(premiere_path, f"{user_id}/{job_id}/premiere")
-        capcut_url = storage_service.upload_folder(capcut_path, f"{user_id}/{job_id}/capcut")
+        def export_and_upload(create_project, kind):
+            """Export one project and upload it to DigitalOcean Spaces"""
+            project_path = create_project(
+                clips=extracted_clips,
+                images=result.get('images', []),
+                output_dir=output_dir,
+                project_name=project_name
+            )
+            return storage_service.upload_folder(project_path, f"{user_id}/{job_id}/{kind}")
+        
+        # The two exports are independent; each one's upload starts as soon
+        # as it is exported, overlapping with the other export
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            premiere_future = executor.submit(export_and_upload, premiere_exporter.create_premiere_project, 'premiere')
+            capcut_future = executor.submit(export_and_upload, capcut_exporter.create_capcut_project, 'capcut')
+            
+            premiere_url = premiere_future.result()
+            capcut_url = capcut_future.result()
         
         # Schedule cleanup (20 minutes)
         expires_at = datetime.utcnow() + timedelta(minutes=20)
@@ -320,21 +492,23 @@ def run_full_pipeline(self, job_id: str, user_id: str, script: str, duration: in
             'expires_at': expires_at.isoformat()
         }
         
-        # Store result in Redis (1 hour TTL)
-        redis_client.setex(
-            f"job_result:{job_id}",
-            3600,
-            json.dumps(result_data)
-        )
-        
-        # Update progress to completed
-        update_job_progress(job_id, 'completed', 100, 'Completed!', 0)
+        # Store result and completed progress in Redis (1 hour TTL);
+        # Firestore gets them with the batch below
+        store_progress(job_id, {
+            'job_id': job_id,
+            'status': 'completed',
+            'progress': 100,
+            'current_step': 'Completed!',
+            'eta_seconds': 0,
+            'updated_at': datetime.utcnow().isoformat()
+        }, result_data=result_data)
         
         # Update job as completed in Firestore (if available)
         if db is not None:
             try:
-                project_ref = db.collection('projects').document(job_id)
-                project_ref.update({
+                # Job result and user's video count in one round trip
+                batch = db.batch()
+                batch.update(db.collection('projects').document(job_id), {
                     'status': 'completed',
                     'progress': 100,
                     'current_step': 'Completed',
@@ -342,14 +516,18 @@ def run_full_pipeline(self, job_id: str, user_id: str, script: str, duration: in
                     'completed_at': firestore.SERVER_TIMESTAMP,
                     'updated_at': firestore.SERVER_TIMESTAMP
                 })
-                
-                # Increment user's video count
-                user_ref = db.collection('users').document(user_id)
-                user_ref.update({
+                # merge=True so a missing user document (e.g. "anonymous")
+                # is created instead of failing the whole batch
+                batch.set(db.collection('users').document(user_id), {
                     'videos_created_this_month': firestore.Increment(1)
-                })
-            except:
-                pass  # Ignore Firestore errors
+                }, merge=True)
+                batch.commit()
+            except Exception as e:
+                logger.error("Firestore completion write failed for job %s: %s", job_id, e)
+            
+            invalidate_job_cache(job_id)
+            redis_client.delete(f"user:{user_id}")
+            decrement_quota(keys=[f"remaining:{user_id}:{datetime.utcnow():%Y-%m}"])
         
         # TODO: Schedule cleanup after 20 minutes (implement later)
         
@@ -361,31 +539,5 @@ def run_full_pipeline(self, job_id: str, user_id: str, script: str, duration: in
         }
     
     except Exception as e:
-        # Update job as failed in Redis
-        error_msg = str(e)
-        redis_client.setex(
-            f"job_progress:{job_id}",
-            3600,
-            json.dumps({
-                'job_id': job_id,
-                'status': 'failed',
-                'progress': 0,
-                'current_step': 'Failed',
-                'error': error_msg,
-                'updated_at': datetime.utcnow().isoformat()
-            })
-        )
-        
-        # Update job as failed in Firestore (if available)
-        if db is not None:
-            try:
-                project_ref = db.collection('projects').document(job_id)
-                project_ref.update({
-                    'status': 'failed',
-                    'error': error_msg,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                })
-            except:
-                pass  # Ignore Firestore errors
-        
+        mark_job_failed(job_id, str(e))
         raise
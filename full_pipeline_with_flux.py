@@ -8,12 +8,12 @@ Step 4: Generate AI images for missing scenes using Cloudflare FLUX
 
 import asyncio
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from src.core.config import Config
 from src.agents.crew import ProductionCrew
 from src.tools.fast_search import FastVideoSearch
-from src.tools.downloader import VideoDownloader
 from src.tools.broll_extractor import BRollExtractor
 from src.tools.flux_generator import integrate_with_image_fallback
 from src.tools.premiere_exporter import PremiereExporter
@@ -132,15 +132,15 @@ async def run_pipeline_with_flux(script: str, duration: float):
     # ========================================================================
     
     print("\n" + "=" * 80)
-    print("STEP 3: DOWNLOADING & EXTRACTING CLIPS")
+    print("STEP 3: EXTRACTING CLIPS")
     print("=" * 80)
     
-    downloader = VideoDownloader()
-    extractor = BRollExtractor()
+    # Only the clip's segment is fetched (yt-dlp + ffmpeg range download),
+    # never the full source video
+    extractor = BRollExtractor(output_dir=str(output_dir / "clips"))
     
-    extracted_clips = []
-    
-    for scene in plan.get('scenes', []):
+    def extract_clip_for_scene(scene):
+        """Extract the clip for a single scene (runs in parallel)"""
         scene_num = scene.get('scene_number', '?')
         scene_desc = scene.get('scene_description', '')
         
@@ -156,43 +156,46 @@ async def run_pipeline_with_flux(script: str, duration: float):
         
         if not best_video:
             print(f"   ⚠️  No videos available - will use AI image fallback")
-            continue
+            return None
         
         try:
-            # Download video
-            print(f"   ⬇️  Downloading: {best_video['title'][:50]}...")
-            video_path = downloader.download(
-                url=best_video['url'],
-                output_dir=str(output_dir / "downloads")
-            )
-            
-            if not video_path:
-                print(f"   ❌ Download failed")
-                continue
-            
-            print(f"   ✓ Downloaded")
-            
             # Extract clip
-            print(f"   ✂️  Extracting clip...")
-            clip_path = extractor.extract_best_clip(
-                video_path=video_path,
+            print(f"   ✂️  Extracting clip from: {best_video['title'][:50]}...")
+            clips = extractor._extract_random_clips(
+                video={
+                    'url': best_video['url'],
+                    'id': best_video['url'].split('=')[-1],  # Extract video ID from URL
+                    'title': best_video.get('title', 'Unknown')
+                },
+                scene_description=scene_desc,
                 duration=scene.get('duration', 5),
-                output_dir=str(output_dir / "clips")
+                num_clips=1
             )
             
-            if clip_path:
+            if clips:
+                clip_path = clips[0]['path']
                 print(f"   ✓ Extracted: {Path(clip_path).name}")
-                extracted_clips.append({
+                return {
                     'scene': scene_desc,
                     'scene_number': scene_num,
                     'path': clip_path,
                     'source_url': best_video['url']
-                })
+                }
             else:
                 print(f"   ❌ Extraction failed")
         
         except Exception as e:
             print(f"   ❌ Error: {e}")
+        
+        return None
+    
+    # Scenes are independent, so download/extract up to 6 at once
+    # (map keeps the clips in scene order)
+    extracted_clips = []
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        for clip in executor.map(extract_clip_for_scene, plan.get('scenes', [])):
+            if clip:
+                extracted_clips.append(clip)
     
     print(f"\n✅ STEP 3 COMPLETE - {len(extracted_clips)} clips extracted")
     
@@ -9,28 +9,36 @@ import random
 import threading
 from pathlib import Path
 from typing import Optional, List
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
+# Scheduling clock: monotonic, so wall-clock adjustments can't stretch or
+# skip a block period or the delay between uses
+_now = time.monotonic
 
-@dataclass
+
+@dataclass(slots=True, kw_only=True)
 class CookieFile:
     """Cookie file metadata"""
-    path: str
-    name: str
-    last_used: float = 0
+    # Fields read on every selection come first, path/name only when used
+    last_used: float = float('-inf')  # never used
+    blocked_until: Optional[float] = None
+    _success_rate: float = field(default=1.0, init=False, repr=False)
     success_count: int = 0
     fail_count: int = 0
     is_blocked: bool = False
-    blocked_until: Optional[float] = None
+    path: str
+    name: str
     
     @property
     def success_rate(self) -> float:
-        """Calculate success rate"""
+        """Success rate as of the last reported download"""
+        return self._success_rate
+    
+    def update_success_rate(self):
+        """Recalculate success rate after the counts change"""
         total = self.success_count + self.fail_count
-        if total == 0:
-            return 1.0
-        return self.success_count / total
+        self._success_rate = self.success_count / total if total else 1.0
     
     @property
     def is_available(self) -> bool:
@@ -39,7 +47,7 @@ class CookieFile:
             return True
         
         # Check if block period has expired
-        if self.blocked_until and time.time() > self.blocked_until:
+        if self.blocked_until and _now() > self.blocked_until:
             self.is_blocked = False
             self.blocked_until = None
             return True
@@ -65,7 +73,8 @@ class CookieManager:
         self.cookies_dir.mkdir(parents=True, exist_ok=True)
         
         self.cookies: List[CookieFile] = []
-        self.lock = threading.Lock()
+        # Waiters are woken when the pool changes instead of polling
+        self.lock = threading.Condition()
         
         # Configuration
         self.block_duration = 300  # 5 minutes block after failures
@@ -77,9 +86,16 @@ class CookieManager:
     
     def _load_cookies(self):
         """Load all cookie files from directory"""
-        cookie_files = list(self.cookies_dir.glob("*.txt"))
+        # One directory pass, no intermediate Path objects
+        with os.scandir(self.cookies_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.txt') and entry.is_file():
+                    self.cookies.append(CookieFile(
+                        path=entry.path,
+                        name=entry.name
+                    ))
         
-        if not cookie_files:
+        if not self.cookies:
             print(f"⚠️  No cookie files found in {self.cookies_dir}")
             print("📝 Instructions:")
             print("   1. Install browser extension: 'Get cookies.txt LOCALLY'")
@@ -88,12 +104,6 @@ class CookieManager:
             print("   4. Recommended: 3-5 cookie files for production")
             return
         
-        for cookie_file in cookie_files:
-            self.cookies.append(CookieFile(
-                path=str(cookie_file),
-                name=cookie_file.name
-            ))
-        
         print(f"✅ Loaded {len(self.cookies)} cookie files")
     
     def get_best_cookie(self) -> Optional[CookieFile]:
@@ -106,43 +116,50 @@ class CookieManager:
         3. Prefer cookies with better success rates
         4. Use least recently used among top performers
         """
-        with self.lock:
-            if not self.cookies:
-                return None
-            
-            # Filter available cookies
-            available = [c for c in self.cookies if c.is_available]
-            
-            if not available:
-                # All blocked, wait for first to unblock
-                print("⚠️  All cookies blocked, waiting for recovery...")
-                time.sleep(5)
-                return self.get_best_cookie()
-            
-            # Filter by minimum delay
-            current_time = time.time()
-            ready = [
-                c for c in available 
-                if current_time - c.last_used >= self.min_delay_between_uses
-            ]
-            
-            if not ready:
-                # Wait for shortest delay
-                wait_time = min(
-                    self.min_delay_between_uses - (current_time - c.last_used)
-                    for c in available
-                )
-                time.sleep(wait_time + 0.1)
-                return self.get_best_cookie()
-            
-            # Sort by success rate (descending) then by last used (ascending)
-            ready.sort(key=lambda c: (-c.success_rate, c.last_used))
-            
-            # Select best cookie
-            best = ready[0]
-            best.last_used = current_time
+        while True:
+            with self.lock:
+                if not self.cookies:
+                    return None
+                
+                current_time = _now()
+                min_delay = self.min_delay_between_uses
+                
+                # Single pass: best ready cookie by success rate (descending) then
+                # last used (ascending), and the shortest wait if none is ready
+                best = None
+                best_key = None
+                wait_time = None
+                
+                for c in self.cookies:
+                    if not c.is_available:
+                        continue
+                    
+                    idle = current_time - c.last_used
+                    if idle >= min_delay:
+                        key = (-c.success_rate, c.last_used)
+                        if best_key is None or key < best_key:
+                            best, best_key = c, key
+                    elif best is None:
+                        remaining = min_delay - idle
+                        if wait_time is None or remaining < wait_time:
+                            wait_time = remaining
+                
+                if best is not None:
+                    # Claim the cookie before the lock is released
+                    best.last_used = current_time
+                    return best
+                
+                if wait_time is not None:
+                    # Wait for shortest delay; wait() releases the lock, so
+                    # reporters and other callers aren't stalled
+                    self.lock.wait(timeout=wait_time + 0.1)
+                    continue
             
-            return best
+            # All blocked: report without holding the lock, then wait for
+            # the first to unblock (add_cookie_file wakes waiters early)
+            print("⚠️  All cookies blocked, waiting for recovery...")
+            with self.lock:
+                self.lock.wait(timeout=5)
     
     def report_success(self, cookie: CookieFile):
         """Report successful download"""
@@ -153,78 +170,102 @@ class CookieManager:
             if cookie.fail_count > 0:
                 cookie.fail_count = max(0, cookie.fail_count - 1)
             
-            print(f"✅ {cookie.name}: Success (rate: {cookie.success_rate:.1%})")
+            cookie.update_success_rate()
+            
+            message = f"✅ {cookie.name}: Success (rate: {cookie.success_rate:.1%})"
+        
+        # Write output after releasing the lock so reporters don't queue on stdout
+        print(message)
     
     def report_failure(self, cookie: CookieFile, error_msg: str = ""):
         """Report failed download"""
         with self.lock:
             cookie.fail_count += 1
+            cookie.update_success_rate()
             
             # Check if should block
             if cookie.fail_count >= self.max_fails_before_block:
                 cookie.is_blocked = True
-                cookie.blocked_until = time.time() + self.block_duration
+                cookie.blocked_until = _now() + self.block_duration
                 cookie.fail_count = 0  # Reset counter
+                cookie.update_success_rate()
                 
-                print(f"🚫 {cookie.name}: Blocked for {self.block_duration}s (too many failures)")
+                message = f"🚫 {cookie.name}: Blocked for {self.block_duration}s (too many failures)"
             else:
-                print(f"❌ {cookie.name}: Failed ({error_msg}) - {cookie.fail_count}/{self.max_fails_before_block}")
+                message = f"❌ {cookie.name}: Failed ({error_msg}) - {cookie.fail_count}/{self.max_fails_before_block}"
+        
+        print(message)
     
     def get_stats(self) -> dict:
         """Get statistics about cookie pool"""
+        # Snapshot under the lock, aggregate after releasing it
         with self.lock:
-            total = len(self.cookies)
-            available = len([c for c in self.cookies if c.is_available])
-            blocked = total - available
-            
-            total_success = sum(c.success_count for c in self.cookies)
-            total_fail = sum(c.fail_count for c in self.cookies)
-            
-            overall_rate = 0.0
-            if total_success + total_fail > 0:
-                overall_rate = total_success / (total_success + total_fail)
-            
-            return {
-                'total_cookies': total,
-                'available': available,
-                'blocked': blocked,
-                'total_downloads': total_success + total_fail,
-                'success_rate': overall_rate,
-                'cookies': [
-                    {
-                        'name': c.name,
-                        'success_rate': c.success_rate,
-                        'downloads': c.success_count + c.fail_count,
-                        'is_blocked': c.is_blocked
-                    }
-                    for c in self.cookies
-                ]
-            }
+            snapshot = [
+                (c.name, c.success_rate, c.success_count, c.fail_count, not c.is_available)
+                for c in self.cookies
+            ]
+        
+        total = len(snapshot)
+        blocked = sum(1 for s in snapshot if s[4])
+        available = total - blocked
+        
+        total_success = sum(s[2] for s in snapshot)
+        total_fail = sum(s[3] for s in snapshot)
+        
+        overall_rate = 0.0
+        if total_success + total_fail > 0:
+            overall_rate = total_success / (total_success + total_fail)
+        
+        return {
+            'total_cookies': total,
+            'available': available,
+            'blocked': blocked,
+            'total_downloads': total_success + total_fail,
+            'success_rate': overall_rate,
+            'cookies': [
+                {
+                    'name': name,
+                    'success_rate': success_rate,
+                    'downloads': success_count + fail_count,
+                    'is_blocked': is_blocked
+                }
+                for name, success_rate, success_count, fail_count, is_blocked in snapshot
+            ]
+        }
     
     def add_cookie_file(self, file_path: str):
         """Add new cookie file to pool"""
+        cookie_file = CookieFile(
+            path=file_path,
+            name=Path(file_path).name
+        )
+        
         with self.lock:
-            cookie_file = CookieFile(
-                path=file_path,
-                name=Path(file_path).name
-            )
             self.cookies.append(cookie_file)
-            print(f"➕ Added cookie: {cookie_file.name}")
+            self.lock.notify_all()
+        
+        print(f"➕ Added cookie: {cookie_file.name}")
     
     def remove_cookie_file(self, name: str):
         """Remove cookie file from pool"""
         with self.lock:
             self.cookies = [c for c in self.cookies if c.name != name]
-            print(f"➖ Removed cookie: {name}")
+            self.lock.notify_all()
+        
+        print(f"➖ Removed cookie: {name}")
 
 
 # Global singleton instance
 _cookie_manager = None
+_cookie_manager_lock = threading.Lock()
 
 
 def get_cookie_manager() -> CookieManager:
     """Get global cookie manager instance"""
     global _cookie_manager
     if _cookie_manager is None:
-        _cookie_manager = CookieManager()
+        with _cookie_manager_lock:
+            # Re-check so concurrent first callers share one pool
+            if _cookie_manager is None:
+                _cookie_manager = CookieManager()
     return _cookie_manager
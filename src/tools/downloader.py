@@ -8,10 +8,70 @@ import time
 import random
 from pathlib import Path
 from typing import Optional
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import download_range_func
 from src.core.models import VideoResult, Platform
 from src.tools.cookie_manager import get_cookie_manager
 
 
+# yt-dlp options shared by every download; per-call fields (outtmpl,
+# cookiefile, sleep_interval, download_ranges) are merged in at call time
+_BASE_YDL_OPTS = {
+    'format': 'best[ext=mp4]/best',
+    'quiet': False,
+    'no_warnings': False,
+    
+    # CRITICAL: Enable Deno JS runtime to solve YouTube's JS challenges
+    'extractor_args': {
+        'youtube': {
+            'player_client': ['tv_embedded', 'web'],
+            'player_skip': ['webpage', 'configs'],
+        }
+    },
+    
+    # Enable remote challenge solver scripts for Deno
+    'remote_components': ['ejs:github'],
+    
+    'referer': 'https://www.youtube.com/',
+    
+    # Rate limiting
+    'max_sleep_interval': 10,
+    'sleep_interval_requests': 3,
+    
+    # Retry settings
+    'retries': 3,
+    'fragment_retries': 3,
+}
+
+YOUTUBE_DOWNLOAD_OPTS = {
+    **_BASE_YDL_OPTS,
+    # Additional options to avoid detection
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+}
+
+URL_DOWNLOAD_OPTS = {
+    **_BASE_YDL_OPTS,
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'sleep_interval_subtitles': 2,
+    'extractor_retries': 3,
+    'nocheckcertificate': True,
+    'prefer_insecure': False,
+    'http_chunk_size': 10485760,
+}
+
+CLIP_DOWNLOAD_OPTS = {
+    **_BASE_YDL_OPTS,
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'force_keyframes_at_cuts': True,
+    
+    # Post-processing to ensure exact duration
+    'postprocessors': [{
+        'key': 'FFmpegVideoConvertor',
+        'preferedformat': 'mp4',
+    }],
+}
+
+
 class VideoDownloader:
     """
     Download videos from various platforms with production-grade features
@@ -33,6 +93,9 @@ class VideoDownloader:
         # Retry configuration
         self.max_retries = 3
         self.base_delay = 2  # seconds
+        
+        # Own generator for sleep/backoff jitter rather than the shared module one
+        self._rng = random.Random()
     
     def download_youtube(self, video: VideoResult, output_name: Optional[str] = None) -> Optional[str]:
         """
@@ -40,13 +103,14 @@ class VideoDownloader:
         
         Automatically retries with different cookies on failure
         """
-        import yt_dlp
-        
         if output_name is None:
             output_name = f"{video.id}.mp4"
         
         output_path = self.output_dir / output_name
         
+        # Per-call options; YoutubeDL mutates its params, so each attempt gets a copy
+        call_opts = {**YOUTUBE_DOWNLOAD_OPTS, 'outtmpl': str(output_path)}
+        
         # Try download with cookie rotation
         for attempt in range(self.max_retries):
             # Get best available cookie
@@ -60,42 +124,15 @@ class VideoDownloader:
                 print(f"📥 Downloading with {cookie.name} (attempt {attempt + 1}/{self.max_retries})...")
                 
                 ydl_opts = {
-                    'format': 'best[ext=mp4]/best',
-                    'outtmpl': str(output_path),
-                    'quiet': False,
-                    'no_warnings': False,
-                    
-                    # CRITICAL: Enable Deno JS runtime to solve YouTube's JS challenges
-                    'extractor_args': {
-                        'youtube': {
-                            'player_client': ['tv_embedded', 'web'],
-                            'player_skip': ['webpage', 'configs'],
-                        }
-                    },
-                    
-                    # Enable remote challenge solver scripts for Deno
-                    'remote_components': ['ejs:github'],
-                    
+                    **call_opts,
                     # Use cookies for authentication
-                    'cookiefile': cookie.path if cookie else None,
-                    
-                    # Additional options to avoid detection
-                    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'referer': 'https://www.youtube.com/',
-                    
-                    # Rate limiting
-                    'sleep_interval': random.uniform(3, 6),
-                    'max_sleep_interval': 10,
-                    'sleep_interval_requests': 3,
-                    
-                    # Retry settings
-                    'retries': 3,
-                    'fragment_retries': 3,
+                    'cookiefile': cookie.path,
+                    'sleep_interval': self._rng.uniform(3, 6),
                 }
                 
                 # Don't use cookies with Android client (not supported)
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                with YoutubeDL(ydl_opts) as ydl:
                     ydl.download([video.url])
                 
                 # Success!
@@ -117,7 +154,7 @@ class VideoDownloader:
                 
                 # Exponential backoff before retry
                 if attempt < self.max_retries - 1:
-                    delay = self.base_delay * (2 ** attempt) + random.uniform(0, 1)
+                    delay = self.base_delay * (2 ** attempt) + self._rng.uniform(0, 1)
                     print(f"⏳ Waiting {delay:.1f}s before retry...")
                     time.sleep(delay)
         
@@ -135,8 +172,6 @@ class VideoDownloader:
         Returns:
             Path to downloaded video or None
         """
-        import yt_dlp
-        
         # Use custom output dir if provided
         if output_dir:
             output_path = Path(output_dir)
@@ -144,6 +179,9 @@ class VideoDownloader:
         else:
             output_path = self.output_dir
         
+        # Per-call options; YoutubeDL mutates its params, so each attempt gets a copy
+        call_opts = {**URL_DOWNLOAD_OPTS, 'outtmpl': str(output_path / '%(id)s.%(ext)s')}
+        
         # Try download with cookie rotation
         for attempt in range(self.max_retries):
             cookie = self.cookie_manager.get_best_cookie()
@@ -159,44 +197,17 @@ class VideoDownloader:
                 print(f"📥 Downloading from {url[:50]}... (attempt {attempt + 1}/{self.max_retries})")
                 
                 ydl_opts = {
-                    'format': 'best[ext=mp4]/best',
-                    'outtmpl': str(output_path / '%(id)s.%(ext)s'),
-                    'quiet': False,
-                    'no_warnings': False,
-                    
-                    # CRITICAL: Enable Deno JS runtime to solve YouTube's JS challenges
-                    'extractor_args': {
-                        'youtube': {
-                            'player_client': ['tv_embedded', 'web'],
-                            'player_skip': ['webpage', 'configs'],
-                        }
-                    },
-                    
-                    # Enable remote challenge solver scripts for Deno
-                    'remote_components': ['ejs:github'],
-                    
+                    **call_opts,
                     # Use cookies for authentication
-                    'cookiefile': cookie_path if cookie_path else None,
-                    
-                    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'referer': 'https://www.youtube.com/',
-                    'sleep_interval': random.uniform(3, 6),
-                    'max_sleep_interval': 10,
-                    'sleep_interval_requests': 3,
-                    'sleep_interval_subtitles': 2,
-                    'retries': 3,
-                    'fragment_retries': 3,
-                    'extractor_retries': 3,
-                    'nocheckcertificate': True,
-                    'prefer_insecure': False,
-                    'http_chunk_size': 10485760,
+                    'cookiefile': cookie_path,
+                    'sleep_interval': self._rng.uniform(3, 6),
                 }
                 
                 # Don't use cookies with Android client (not supported)
                 # if cookie_path:
                 #     ydl_opts['cookiefile'] = cookie_path
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                with YoutubeDL(ydl_opts) as ydl:
                     info = ydl.extract_info(url, download=True)
                     filename = ydl.prepare_filename(info)
                 
@@ -214,7 +225,7 @@ class VideoDownloader:
                 print(f"❌ Download error: {e}")
                 
                 if attempt < self.max_retries - 1:
-                    delay = self.base_delay * (2 ** attempt) + random.uniform(0, 1)
+                    delay = self.base_delay * (2 ** attempt) + self._rng.uniform(0, 1)
                     time.sleep(delay)
         
         return None
@@ -233,11 +244,25 @@ class VideoDownloader:
         Returns:
             Path to extracted clip or None
         """
-        import yt_dlp
-        
         # Create output directory
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
         
+        if start_time == 0:
+            # Pick a random start from the duration yt-dlp already extracted
+            # for the download, instead of probing the video in a separate
+            # YoutubeDL first
+            download_ranges = self._random_clip_range(duration)
+        else:
+            download_ranges = download_range_func(None, [(start_time, start_time + duration)])
+        
+        # Per-call options; YoutubeDL mutates its params, so each attempt gets a copy
+        call_opts = {
+            **CLIP_DOWNLOAD_OPTS,
+            'outtmpl': output_path,
+            # Extract specific segment using ffmpeg
+            'download_ranges': download_ranges,
+        }
+        
         # Try download with cookie rotation
         for attempt in range(self.max_retries):
             cookie = self.cookie_manager.get_best_cookie()
@@ -251,67 +276,14 @@ class VideoDownloader:
             try:
                 print(f"✂️ Extracting {duration}s clip from {url[:50]}... (attempt {attempt + 1}/{self.max_retries})")
                 
-                # If start_time is 0, get video info first to pick random start
-                if start_time == 0:
-                    info_opts = {
-                        'quiet': True,
-                        'cookiefile': cookie_path,
-                        'extractor_args': {
-                            'youtube': {
-                                'player_client': ['tv_embedded', 'web'],
-                                'player_skip': ['webpage', 'configs'],
-                            }
-                        },
-                        'remote_components': ['ejs:github'],
-                    }
-                    with yt_dlp.YoutubeDL(info_opts) as ydl:
-                        info = ydl.extract_info(url, download=False)
-                        video_duration = info.get('duration', 60)
-                        # Pick random start time, leaving room for the clip
-                        max_start = max(0, video_duration - duration - 5)
-                        start_time = random.uniform(0, max_start) if max_start > 0 else 0
-                
                 # Download only the specific segment
                 ydl_opts = {
-                    'format': 'best[ext=mp4]/best',
-                    'outtmpl': output_path,
-                    'quiet': False,
-                    'no_warnings': False,
-                    
-                    # CRITICAL: Enable Deno JS runtime
-                    'extractor_args': {
-                        'youtube': {
-                            'player_client': ['tv_embedded', 'web'],
-                            'player_skip': ['webpage', 'configs'],
-                        }
-                    },
-                    
-                    # Enable remote challenge solver scripts for Deno
-                    'remote_components': ['ejs:github'],
-                    
-                    # Use cookies
-                    'cookiefile': cookie_path if cookie_path else None,
-                    
-                    # Extract specific segment using ffmpeg
-                    'download_ranges': yt_dlp.utils.download_range_func(None, [(start_time, start_time + duration)]),
-                    'force_keyframes_at_cuts': True,
-                    
-                    # Post-processing to ensure exact duration
-                    'postprocessors': [{
-                        'key': 'FFmpegVideoConvertor',
-                        'preferedformat': 'mp4',
-                    }],
-                    
-                    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'referer': 'https://www.youtube.com/',
-                    'sleep_interval': random.uniform(3, 6),
-                    'max_sleep_interval': 10,
-                    'sleep_interval_requests': 3,
-                    'retries': 3,
-                    'fragment_retries': 3,
+                    **call_opts,
+                    'cookiefile': cookie_path,
+                    'sleep_interval': self._rng.uniform(3, 6),
                 }
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                with YoutubeDL(ydl_opts) as ydl:
                     ydl.download([url])
                 
                 # Success!
@@ -328,12 +300,23 @@ class VideoDownloader:
                 print(f"❌ Clip extraction error: {e}")
                 
                 if attempt < self.max_retries - 1:
-                    delay = self.base_delay * (2 ** attempt) + random.uniform(0, 1)
+                    delay = self.base_delay * (2 ** attempt) + self._rng.uniform(0, 1)
                     time.sleep(delay)
         
         print(f"❌ Failed to extract clip after {self.max_retries} attempts")
         return None
     
+    def _random_clip_range(self, duration: float):
+        """yt-dlp download_ranges callback for a clip at a random start time"""
+        def pick_range(info: dict, ydl):
+            video_duration = info.get('duration') or 60
+            # Pick random start time, leaving room for the clip
+            max_start = max(0, video_duration - duration - 5)
+            start = self._rng.uniform(0, max_start) if max_start > 0 else 0
+            return [{'start_time': start, 'end_time': start + duration}]
+        
+        return pick_range
+    
     def get_stats(self) -> dict:
         """Get download statistics"""
         return self.cookie_manager.get_stats()
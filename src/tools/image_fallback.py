@@ -14,27 +14,84 @@ NOTE: This module generates prompts. To actually generate images with FLUX:
 See FLUX_SETUP.md for complete setup instructions.
 """
 
-import json
+import hashlib
+import logging
+import os
+import orjson
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional
 from src.core.config import Config
 from crewai import LLM
 
+logger = logging.getLogger(__name__)
+
+# Separators for the plain-text copy of saved prompts
+TXT_HEADER_RULE = "=" * 80 + "\n\n"
+TXT_SCENE_RULE = "\n" + "-" * 80 + "\n\n"
+
+# System instructions shared by every scene of a run (a stable prefix the
+# provider can cache); the user message carries only the scene itself
+IMAGE_PROMPT_SYSTEM = """You are an expert at creating detailed image generation prompts for AI image generators like Midjourney, DALL-E, and Stable Diffusion.
+
+For the scene information you are given, create a SINGLE, detailed image generation prompt that:
+1. Captures the LITERAL meaning of the scene (don't over-interpret)
+2. Includes specific visual details (composition, lighting, style)
+3. Matches the mood and tone
+4. Is optimized for photorealistic/historical style
+5. Is 1-2 sentences maximum
+
+CRITICAL: Stay LITERAL to the scene description. If it says "rocket launching", describe a rocket launching - not "space exploration" or metaphors.
+
+Respond with ONLY a JSON object of the form {"image_prompt": "<the prompt>"}, nothing else."""
+
+
+@lru_cache(maxsize=4)
+def get_prompt_llm(model: str, api_key: str) -> LLM:
+    """One LLM client per model/key, shared by every ImageFallbackGenerator"""
+    os.environ['GROQ_API_KEY'] = api_key
+    return LLM(model=model, api_key=api_key)
+
+
+# AI prompts by request digest, shared by every ImageFallbackGenerator like
+# the LLM client; least recently used entries are evicted past the limit
+PROMPT_CACHE_SIZE = 512
+_prompt_cache: OrderedDict = OrderedDict()
+_prompt_cache_lock = threading.Lock()
+
+
+def get_cached_prompt(cache_key: str) -> Optional[str]:
+    """Cached prompt for a request digest, marked as most recently used"""
+    with _prompt_cache_lock:
+        prompt = _prompt_cache.get(cache_key)
+        if prompt is not None:
+            _prompt_cache.move_to_end(cache_key)
+        return prompt
+
+
+def cache_prompt(cache_key: str, prompt: str):
+    """Remember a prompt, evicting the least recently used past the limit"""
+    with _prompt_cache_lock:
+        _prompt_cache[cache_key] = prompt
+        _prompt_cache.move_to_end(cache_key)
+        if len(_prompt_cache) > PROMPT_CACHE_SIZE:
+            _prompt_cache.popitem(last=False)
+
 
 class ImageFallbackGenerator:
     """Generate image prompts for scenes that have no video clips"""
     
-    def __init__(self):
+    # Scene prompts requested from the LLM at once (bounded for Groq rate limits)
+    max_concurrent_prompts = 8
+    
+    @cached_property
+    def llm(self) -> LLM:
+        """LLM for prompt generation, created on first use"""
         config = Config.load()
-        
-        # Initialize LLM for prompt generation
-        import os
-        os.environ['GROQ_API_KEY'] = config.model.groq_api_key
-        
-        self.llm = LLM(
-            model=f"groq/{config.model.model_name}",
-            api_key=config.model.groq_api_key
-        )
+        return get_prompt_llm(f"groq/{config.model.model_name}", config.model.groq_api_key)
     
     def check_missing_scenes(
         self,
@@ -53,24 +110,28 @@ class ImageFallbackGenerator:
         """
         print("\n🔍 Checking for scenes without clips...")
         
-        # Get scene descriptions that have clips
-        scenes_with_clips = set()
-        for clip in extracted_clips:
-            scenes_with_clips.add(clip.get('scene', ''))
+        # Clips are matched by scene number where the extractor recorded it,
+        # otherwise by description (ignoring surrounding whitespace)
+        numbers_with_clips = frozenset(
+            clip['scene_number'] for clip in extracted_clips
+            if clip.get('scene_number') is not None
+        )
+        scenes_with_clips = frozenset(clip.get('scene', '').strip() for clip in extracted_clips)
         
         # Find scenes without clips
-        missing_scenes = []
-        for scene in scenes:
-            scene_desc = scene.get('scene_description', '')
-            if scene_desc not in scenes_with_clips:
-                missing_scenes.append(scene)
+        missing_scenes = [
+            scene for scene in scenes
+            if scene.get('scene_number') not in numbers_with_clips
+            and scene.get('scene_description', '').strip() not in scenes_with_clips
+        ]
         
         print(f"✅ Found {len(missing_scenes)} scenes without clips")
         
-        if missing_scenes:
-            print("\n📋 Missing scenes:")
+        # Per-scene listing only when debugging; skip the formatting otherwise
+        if missing_scenes and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Missing scenes:")
             for i, scene in enumerate(missing_scenes, 1):
-                print(f"   {i}. Scene {scene.get('scene_number')}: {scene.get('scene_description', '')[:60]}...")
+                logger.debug(f"   {i}. Scene {scene.get('scene_number')}: {scene.get('scene_description', '')[:60]}...")
         
         return missing_scenes
     
@@ -89,52 +150,63 @@ class ImageFallbackGenerator:
         Returns:
             Detailed image generation prompt
         """
+        # Short, concrete scenes are described well enough by the template
+        if not self._needs_llm(scene):
+            return self._generate_simple_prompt(scene)
+        
         scene_desc = scene.get('scene_description', '')
         keywords = scene.get('keywords', [])
         visual_context = scene.get('visual_context', '')
         mood = scene.get('mood_tone', '')
         
+        # Script context goes in the system message, identical for every scene
+        system_prompt = IMAGE_PROMPT_SYSTEM
+        if script_context:
+            system_prompt += f"\n\nScript Context: {script_context}"
+        
         # Build context for AI
-        context = f"""
+        scene_request = f"""Given this scene information:
+
 Scene Description: {scene_desc}
 Visual Context: {visual_context}
 Keywords: {', '.join(keywords)}
 Mood/Tone: {mood}
 """
         
-        if script_context:
-            context += f"\nScript Context: {script_context}"
+        # Same scene and script context means the same request; reuse its answer
+        digest = hashlib.blake2b(system_prompt.encode(), digest_size=16)
+        digest.update(b'\0')
+        digest.update(scene_request.encode())
+        cache_key = digest.hexdigest()
+        cached = get_cached_prompt(cache_key)
+        if cached is not None:
+            print(f"   ♻️ Cached prompt: {cached[:80]}...")
+            return cached
         
-        # Generate prompt using AI
-        prompt_request = f"""You are an expert at creating detailed image generation prompts for AI image generators like Midjourney, DALL-E, and Stable Diffusion.
-
-Given this scene information:
-{context}
-
-Create a SINGLE, detailed image generation prompt that:
-1. Captures the LITERAL meaning of the scene (don't over-interpret)
-2. Includes specific visual details (composition, lighting, style)
-3. Matches the mood and tone
-4. Is optimized for photorealistic/historical style
-5. Is 1-2 sentences maximum
-
-CRITICAL: Stay LITERAL to the scene description. If it says "rocket launching", describe a rocket launching - not "space exploration" or metaphors.
-
-Output ONLY the image prompt, nothing else."""
-
         try:
             # Call LLM to generate prompt (without temperature - not supported by CrewAI LLM wrapper)
             response = self.llm.call(
-                messages=[{"role": "user", "content": prompt_request}]
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": scene_request}
+                ]
             )
             
             # Extract the prompt from response
             if hasattr(response, 'content'):
-                image_prompt = response.content.strip()
+                image_prompt = self._parse_image_prompt(response.content)
             else:
-                image_prompt = str(response).strip()
+                image_prompt = self._parse_image_prompt(str(response))
+            
+            # Never hand raw prose or a broken reply to the image model
+            if not image_prompt:
+                raise ValueError("no image_prompt in response")
             
             print(f"   ✅ AI-generated prompt: {image_prompt[:80]}...")
+            
+            # Only AI prompts are cached so a failed call is retried next time
+            cache_prompt(cache_key, image_prompt)
+            
             return image_prompt
         
         except Exception as e:
@@ -142,21 +214,35 @@ Output ONLY the image prompt, nothing else."""
             # Fallback to simple prompt
             return self._generate_simple_prompt(scene)
     
+    def _needs_llm(self, scene: Dict) -> bool:
+        """Whether a scene has enough detail to be worth an LLM-written prompt"""
+        return (
+            len(scene.get('scene_description', '')) > 40
+            or len(scene.get('keywords', [])) > 5
+            or bool(scene.get('visual_context'))
+        )
+    
+    def _parse_image_prompt(self, text: str) -> Optional[str]:
+        """Read image_prompt from the JSON reply (None if the reply isn't one)"""
+        start = text.find('{')
+        end = text.rfind('}')
+        if start != -1 and end > start:
+            try:
+                # Slice past any code fence or preamble around the object
+                return str(orjson.loads(text[start:end + 1])['image_prompt']).strip()
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                pass
+        
+        return None
+    
     def _generate_simple_prompt(self, scene: Dict) -> str:
         """Fallback: Generate simple prompt without AI"""
-        scene_desc = scene.get('scene_description', '')
-        keywords = scene.get('keywords', [])
+        keywords = ', '.join(scene.get('keywords', [])[:3])
         mood = scene.get('mood_tone', '')
+        mood_part = f", {mood} mood" if mood else ""
         
         # Simple template
-        prompt = f"{scene_desc}, {', '.join(keywords[:3])}"
-        
-        if mood:
-            prompt += f", {mood} mood"
-        
-        prompt += ", photorealistic, historical footage style, high quality"
-        
-        return prompt
+        return f"{scene.get('scene_description', '')}, {keywords}{mood_part}, photorealistic, historical footage style, high quality"
     
     def generate_prompts_for_missing_scenes(
         self,
@@ -189,17 +275,22 @@ Output ONLY the image prompt, nothing else."""
         # Step 2: Generate prompts for missing scenes
         print(f"\n🤖 Generating AI image prompts for {len(missing_scenes)} scenes...")
         
+        # Each prompt is an independent LLM round-trip, so keep several in flight
+        workers = min(self.max_concurrent_prompts, len(missing_scenes))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            image_prompts = list(pool.map(
+                lambda scene: self.generate_image_prompt(scene, script_context),
+                missing_scenes
+            ))
+        
         results = []
-        for i, scene in enumerate(missing_scenes, 1):
+        summary = []
+        for i, (scene, image_prompt) in enumerate(zip(missing_scenes, image_prompts), 1):
             scene_num = scene.get('scene_number', i)
             scene_desc = scene.get('scene_description', '')
             
-            print(f"\n   Scene {scene_num}: {scene_desc[:60]}...")
-            
-            # Generate prompt
-            image_prompt = self.generate_image_prompt(scene, script_context)
-            
-            print(f"   ✅ Prompt: {image_prompt[:80]}...")
+            summary.append(f"\n   Scene {scene_num}: {scene_desc[:60]}...")
+            summary.append(f"   ✅ Prompt: {image_prompt[:80]}...")
             
             results.append({
                 'scene_number': scene_num,
@@ -210,6 +301,8 @@ Output ONLY the image prompt, nothing else."""
                 'mood_tone': scene.get('mood_tone', '')
             })
         
+        # One write for the whole per-scene summary
+        print('\n'.join(summary))
         print(f"\n✅ Generated {len(results)} image prompts")
         
         return results
@@ -223,25 +316,25 @@ Output ONLY the image prompt, nothing else."""
         output_file = Path(output_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_file, 'w') as f:
-            json.dump({
-                'total_prompts': len(prompts),
-                'prompts': prompts
-            }, f, indent=2)
+        output_file.write_bytes(orjson.dumps({
+            'total_prompts': len(prompts),
+            'prompts': prompts
+        }, option=orjson.OPT_INDENT_2))
         
         print(f"\n💾 Saved prompts to: {output_file}")
         
         # Also save as text file for easy copy-paste
         txt_file = output_file.with_suffix('.txt')
-        with open(txt_file, 'w') as f:
-            f.write("IMAGE GENERATION PROMPTS\n")
-            f.write("="*80 + "\n\n")
-            
-            for i, prompt_data in enumerate(prompts, 1):
-                f.write(f"Scene {prompt_data['scene_number']}: {prompt_data['scene_description']}\n")
-                f.write(f"Keywords: {', '.join(prompt_data['keywords'])}\n")
-                f.write(f"\nIMAGE PROMPT:\n{prompt_data['image_prompt']}\n")
-                f.write("\n" + "-"*80 + "\n\n")
+        parts = ["IMAGE GENERATION PROMPTS\n", TXT_HEADER_RULE]
+        for prompt_data in prompts:
+            parts.append(
+                f"Scene {prompt_data['scene_number']}: {prompt_data['scene_description']}\n"
+                f"Keywords: {', '.join(prompt_data['keywords'])}\n"
+                f"\nIMAGE PROMPT:\n{prompt_data['image_prompt']}\n"
+            )
+            parts.append(TXT_SCENE_RULE)
+        
+        txt_file.write_text(''.join(parts), encoding='utf-8')
         
         print(f"💾 Saved text version to: {txt_file}")
 